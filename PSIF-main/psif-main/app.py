@@ -1,37 +1,124 @@
+import csv
+import io
+import json
+import math
 from datetime import datetime
-from flask import Flask, session, request, render_template, url_for, redirect, flash
+from functools import wraps
+from flask import Flask, Response, session, request, render_template, url_for, redirect, flash, make_response, jsonify
+from markupsafe import Markup
 from database.db import obter_conexao
+from database.migrar import migrar
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, login_required, login_user, logout_user, current_user
 from models.usuario import User
 from models.lancamentos import Lancamento
 from models.participantes import Participante
 from models.planilhas import Planilha
-from simulacoes import SimulacaoJurosCompostos, SimulacaoSemRendimento
+from simulacoes import SimulacaoJurosCompostos, SimulacaoSemRendimento, simular_em_cache, simular_grade
+from importacao import ErroImportacao, importar_lancamentos, obter_tarefa
 from util import datas
+from util.cache import cache_planilhas
 
 app = Flask(__name__)
 app.secret_key = 'chave_secreta'
 
 #  Chave para criptografia de cookies na sessão
 app.config['SECRET_KEY'] = 'superdificil'
+
+# Quantidade de lançamentos por página na lista de lançamentos (e o máximo aceito em ?tamanho=).
+app.config['TAMANHO_PAGINA_LANCAMENTOS'] = 50
+app.config['TAMANHO_MAXIMO_PAGINA_LANCAMENTOS'] = 500
+
+# Maior período aceito no cronograma e na grade de cenários das simulações (100 anos).
+app.config['MAX_MESES_CRONOGRAMA'] = 1200
+
+# Garante que o banco está na versão mais recente do esquema.
+migrar()
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.get(user_id)
+    return User.get_em_cache(user_id)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Tamanho aproximado dos blocos enviados pelas respostas CSV geradas aos poucos.
+TAMANHO_BLOCO_CSV = 65536
+
+def csv_em_blocos(cabecalho, linhas, bom: bool = False):
+    '''Gera um CSV com o `cabecalho` e as `linhas` em blocos de ~TAMANHO_BLOCO_CSV bytes.
+
+    Serve de corpo para um Response: as linhas são consumidas aos poucos, então o arquivo
+    inteiro nunca fica na memória. Com `bom`, começa com o BOM, que faz o Excel
+    reconhecer o arquivo como UTF-8.
+    '''
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if bom:
+        buffer.write('\ufeff')
+    escritor.writerow(cabecalho)
+    for linha in linhas:
+        escritor.writerow(linha)
+        # Envia em blocos em vez de uma linha por vez.
+        if buffer.tell() > TAMANHO_BLOCO_CSV:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def fragmento_em_cache(nome: str, p: Planilha, gerar) -> Markup:
+    '''Retorna o trecho de HTML `nome` da planilha `p`, renderizando com `gerar()` só se não estiver em cache.
+
+    A chave inclui a versão da planilha, então qualquer alteração nela gera um trecho novo.
+    '''
+    return Markup(cache_planilhas.obter_ou_gerar((nome, p.id, p.versao), gerar))
+
+def get_condicional(marcador):
+    '''Decorador que responde 304 a GETs condicionais (If-None-Match) quando nada mudou.
+
+    `marcador(**parametros_da_rota)` deve retornar um texto barato de obter que muda sempre
+    que a página muda, ou None para responder normalmente sem ETag. O ETag combina a rota,
+    o usuário e o marcador. Deve ficar abaixo de @login_required.
+    '''
+    def decorador(rota):
+        @wraps(rota)
+        def envoltorio(*args, **kwargs):
+            # Mensagens flash pendentes precisam de uma página nova para aparecer.
+            if request.method != 'GET' or '_flashes' in session:
+                return rota(*args, **kwargs)
+            valor = marcador(**kwargs)
+            if valor is None:
+                return rota(*args, **kwargs)
+            etag = f'{rota.__name__}-{current_user.id}-{valor}'
+            if request.if_none_match.contains_weak(etag):
+                resposta = app.response_class(status=304)
+            else:
+                resposta = make_response(rota(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            resposta.set_etag(etag, weak=True)
+            # O navegador guarda a página, mas revalida a cada acesso.
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+            return resposta
+        return envoltorio
+    return decorador
+
+def marcador_planilha(id_planilha=None, id=None, **_):
+    '''Marcador de alteração das páginas de uma planilha do usuário logado.'''
+    return Planilha.marcador_alteracao(id_planilha if id_planilha is not None else id, current_user.id)
+
 ########################################################################
 
 @app.route('/planilhas/<id>', methods=['GET', 'POST'])
 @login_required
+@get_condicional(marcador_planilha)
 def planilha(id):
-    p = Planilha.find(id)
+    # A página só usa os participantes (no formulário de lançamentos), e só se não estiverem em cache.
+    p = Planilha.find(id, carregar=())
 
     if not p:
         return render_template('erro404.html')
@@ -50,7 +137,14 @@ def planilha(id):
             if m == 0:
                 m = 12
             meses += [datas.mes(m)]
-        return render_template('planilha.html', planilha=p, meses=meses)
+
+        def gerar():
+            p.carregar_relacoes(('participantes',))
+            return render_template('fragmentos/opcoes_participantes.html', participantes=p.participantes)
+
+        opcoes_participantes = fragmento_em_cache('opcoes_participantes', p, gerar)
+        return render_template('planilha.html', planilha=p, meses=meses,
+                               opcoes_participantes=opcoes_participantes, progresso=p.progresso())
     
     else:
         return render_template('erro404.html')
@@ -59,6 +153,7 @@ def planilha(id):
 
 @app.route('/planilhas', methods=['GET', 'POST'])
 @login_required
+@get_condicional(lambda: Planilha.marcador_alteracao_usuario(current_user.id))
 def planilhas():
     if request.method == 'POST':
         id_usuario = current_user.id
@@ -70,8 +165,9 @@ def planilhas():
         p.salvar()
         
     
-    planilhas = Planilha.consultar('SELECT * FROM planilhas WHERE id_usuario=?', (current_user.id,))  # TODO: Filtrar pelo usuário logado
-    return render_template('planilhas.html', planilhas=planilhas)
+    # Uma consulta traz as planilhas com os totais, participantes e último lançamento de cada uma.
+    painel = Planilha.painel(current_user.id)
+    return render_template('planilhas.html', painel=painel)
 
 ########################################################################
 
@@ -126,10 +222,11 @@ def excluir_lancamento(id_planilha, id_lancamento):
 
 @app.route('/planilhas/<int:id_planilha>/grafico', methods=['GET'])
 @login_required
+@get_condicional(marcador_planilha)
 def grafico(id_planilha):
     # TODO: Criar função para não repetir esse código da rota Planilhas.
 
-    p = Planilha.find(id_planilha)
+    p = Planilha.find(id_planilha, carregar=())
 
     if not p:
         return render_template('erro404.html')
@@ -147,35 +244,217 @@ def grafico(id_planilha):
             m = 12
         meses += [datas.mes(m)]
 
-    return render_template('grafico.html', planilha=p, meses=meses)
+    def gerar():
+        # Os totais do gráfico vêm do banco; só os participantes são carregados.
+        p.carregar_relacoes(('participantes',))
+        return render_template('fragmentos/grafico.html', planilha=p, meses=meses)
+
+    tabela = fragmento_em_cache('grafico', p, gerar)
+    return render_template('grafico.html', planilha=p, tabela=tabela)
+
+#################################################################
+
+@app.route('/planilhas/<int:id_planilha>/progresso', methods=['GET'])
+@login_required
+@get_condicional(marcador_planilha)
+def progresso(id_planilha):
+    '''Retorna em JSON o progresso da planilha e o total e o saldo mês a mês de cada participante.
+
+    Tudo é somado pelo banco a partir dos totais mensais, sem carregar os lançamentos.
+    '''
+    p = Planilha.find(id_planilha, carregar=())
+
+    if not p or p.id_usuario != current_user.id:
+        return jsonify(erro='Planilha não encontrada.'), 404
+
+    saldos = {}
+    for id_participante, mes, acumulado in p.saldos_mensais():
+        saldos.setdefault(id_participante, []).append([mes, acumulado])
+    resposta = p.progresso()
+    resposta['participantes'] = [{
+        'id': id_participante,
+        'nome': nome,
+        'total': total,
+        'quantidade': quantidade,
+        'saldos': saldos.get(id_participante, []),
+    } for id_participante, nome, total, quantidade in p.totais_participantes()]
+    return jsonify(resposta)
+
+#################################################################
+
+def marcador_conciliacao(id_planilha, **_):
+    '''Marcador da conciliação: a planilha e a taxa pedida mudam a resposta.'''
+    try:
+        taxa = float(request.args.get('taxa', 0))
+    except ValueError:
+        return None
+    valor = marcador_planilha(id_planilha=id_planilha)
+    return f'{valor}.{taxa!r}' if valor is not None else None
+
+@app.route('/planilhas/<int:id_planilha>/conciliacao', methods=['GET'])
+@login_required
+@get_condicional(marcador_conciliacao)
+def conciliacao(id_planilha):
+    '''Retorna em JSON o acumulado esperado e o realizado de cada participante, mês a mês.
+
+    A taxa de juros da simulação vem de `?taxa=` (% ao ano); por padrão, 0.
+    '''
+    p = Planilha.find(id_planilha, carregar=('participantes',))
+
+    if not p or p.id_usuario != current_user.id:
+        return jsonify(erro='Planilha não encontrada.'), 404
+
+    try:
+        taxa_juros = taxa_mensal(request.args.get('taxa', 0))  # Convertendo para taxa mensal
+    except ValueError:
+        return jsonify(erro='Parâmetros inválidos.'), 400
+
+    c = p.conciliacao(taxa_juros)
+    return jsonify(
+        meses=c.colunas,
+        esperado=c.esperado,
+        participantes=[{
+            'id': participante.id,
+            'nome': participante.nome,
+            'realizado': realizado,
+            'diferenca': diferenca,
+        } for participante, realizado, diferenca in zip(c.linhas, c.realizado, c.diferenca)],
+    )
 
 #################################################################
 
 @app.route('/planilhas/<int:id_planilha>/lista_participantes', methods=['GET'])
 @login_required
+@get_condicional(marcador_planilha)
 def lista_participantes(id_planilha):
     # TODO: Criar função para não repetir esse código da rota Planilhas.
 
-    p = Planilha.find(id_planilha)
+    p = Planilha.find(id_planilha, carregar=())
 
     if not p:
         return render_template('erro404.html')
     
-    return render_template('participantes.html', planilha=p)
+    def gerar():
+        participantes = Participante.consultar_iter('SELECT * FROM participantes WHERE id_planilha = ?', (p.id,))
+        return render_template('fragmentos/participantes.html', participantes=participantes)
+
+    lista = fragmento_em_cache('lista_participantes', p, gerar)
+    return render_template('participantes.html', planilha=p, lista=lista)
 
 #################################################################
 
 @app.route('/planilhas/<int:id_planilha>/lista_lancamentos', methods=['GET'])
 @login_required
+@get_condicional(marcador_planilha)
 def lista_lancamentos(id_planilha):
     # TODO: Criar função para não repetir esse código da rota Planilhas.
 
-    p = Planilha.find(id_planilha)
+    p = Planilha.find(id_planilha, carregar=())
 
     if not p:
         return render_template('erro404.html')
     
-    return render_template('lancamentos.html', planilha=p)
+    tamanho = app.config['TAMANHO_PAGINA_LANCAMENTOS']
+
+    def gerar():
+        lancamentos, proximo = Lancamento.pagina(p.id, tamanho)
+        return renderizar_pagina_lancamentos(p, lancamentos, proximo, tamanho)
+
+    # Só a primeira página é renderizada aqui; as seguintes vêm de mais_lancamentos.
+    lista = fragmento_em_cache(f'lista_lancamentos:{tamanho}', p, gerar)
+    return render_template('lancamentos.html', planilha=p, lista=lista)
+
+def renderizar_pagina_lancamentos(p: Planilha, lancamentos: list, proximo, tamanho: int) -> str:
+    '''Renderiza uma página da lista de lançamentos, com o botão "Carregar mais" se houver próxima.'''
+    if proximo is not None:
+        proximo = Lancamento.codificar_cursor(proximo)
+    return render_template('fragmentos/lancamentos.html', planilha=p, lancamentos=lancamentos,
+                           proximo=proximo, tamanho=tamanho)
+
+#################################################################
+
+@app.route('/planilhas/<int:id_planilha>/lista_lancamentos/mais', methods=['GET'])
+@login_required
+def mais_lancamentos(id_planilha):
+    '''Retorna em JSON a próxima página da lista de lançamentos, a partir do cursor `apos`.'''
+    p = Planilha.find(id_planilha, carregar=())
+
+    if not p or p.id_usuario != current_user.id:
+        return jsonify(erro='Planilha não encontrada.'), 404
+
+    try:
+        apos = request.args.get('apos')
+        apos = Lancamento.decodificar_cursor(apos) if apos else None
+        tamanho = int(request.args.get('tamanho', app.config['TAMANHO_PAGINA_LANCAMENTOS']))
+    except ValueError:
+        return jsonify(erro='Parâmetros inválidos.'), 400
+    tamanho = max(1, min(tamanho, app.config['TAMANHO_MAXIMO_PAGINA_LANCAMENTOS']))
+
+    lancamentos, proximo = Lancamento.pagina(p.id, tamanho, apos)
+    return jsonify(
+        lancamentos=[{
+            'id': l.id,
+            'participante': l.participante,
+            'descricao': l.descricao,
+            'data': l.data,
+            'valor': l.valor,
+        } for l in lancamentos],
+        proximo=Lancamento.codificar_cursor(proximo) if proximo is not None else None,
+        html=renderizar_pagina_lancamentos(p, lancamentos, proximo, tamanho),
+    )
+
+#################################################################
+
+@app.route('/planilhas/<int:id_planilha>/exportar.csv', methods=['GET'])
+@login_required
+def exportar_lancamentos(id_planilha):
+    '''Baixa todos os lançamentos da planilha em CSV, gerado aos poucos enquanto é enviado.'''
+    p = Planilha.find(id_planilha, carregar=())
+
+    if not p or p.id_usuario != current_user.id:
+        return render_template('erro404.html')
+
+    cabecalho = ['id', 'data', 'participante', 'descricao', 'valor']
+    return Response(csv_em_blocos(cabecalho, p.linhas_exportacao(), bom=True), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=planilha_{p.id}.csv'})
+
+#################################################################
+
+@app.route('/planilhas/<int:id_planilha>/importar', methods=['POST'])
+@login_required
+def importar(id_planilha):
+    '''Importa lançamentos de um CSV (participante, data, descricao, valor).
+
+    Responde em JSON. Arquivos grandes são importados em segundo plano: a resposta
+    é 202 e traz a URL para acompanhar o progresso.
+    '''
+    p = Planilha.find(id_planilha, carregar=())
+
+    if not p or p.id_usuario != current_user.id:
+        return jsonify(erro='Planilha não encontrada.'), 404
+
+    arquivo = request.files.get('arquivo')
+    if not arquivo:
+        return jsonify(erro='Envie um arquivo CSV.'), 400
+    try:
+        tarefa = importar_lancamentos(p.id, arquivo.read())
+    except ErroImportacao as erro:
+        return jsonify(erro=str(erro)), 400
+
+    resposta = tarefa.como_dict()
+    resposta['url_progresso'] = url_for('progresso_importacao', id_planilha=p.id, id_tarefa=tarefa.id)
+    if not tarefa.terminada:
+        return jsonify(resposta), 202
+    return jsonify(resposta), 200 if tarefa.situacao == 'concluida' else 400
+
+@app.route('/planilhas/<int:id_planilha>/importar/<id_tarefa>', methods=['GET'])
+@login_required
+def progresso_importacao(id_planilha, id_tarefa):
+    '''Retorna em JSON o progresso de uma importação.'''
+    tarefa = obter_tarefa(id_tarefa)
+    if not tarefa or tarefa.id_planilha != id_planilha or not Planilha.marcador_alteracao(id_planilha, current_user.id):
+        return jsonify(erro='Importação não encontrada.'), 404
+    return jsonify(tarefa.como_dict())
 
 #################################################################
 
@@ -256,18 +535,30 @@ if __name__ == '__main__':
 
 ####################################################################
 
+def taxa_mensal(taxa_anual) -> float:
+    '''Converte uma taxa em % ao ano na taxa mensal usada pelas simulações.
+
+    Lança ValueError se não for um número finito ou se for de -100% ao mês ou menos,
+    em que o saldo zera ou troca de sinal e não há mensalidade que atinja o objetivo.
+    '''
+    taxa = float(taxa_anual) / 100 / 12
+    if not math.isfinite(taxa) or taxa <= -1:
+        raise ValueError(f'Taxa de juros inválida: {taxa_anual}.')
+    return taxa
+
 @app.route('/juros', methods=['GET', 'POST'])
 @login_required
 def juros():
     if request.method == 'POST':
         try:
             objetivo = float(request.form['objetivo'])  # Valor total que se quer juntar
-            taxa_juros = float(request.form['taxa']) / 100 / 12  # Convertendo para taxa mensal
+            taxa_juros = taxa_mensal(request.form['taxa'])  # Convertendo para taxa mensal
             periodo_meses = int(request.form['periodo'])  # Período em meses
             num_participantes = int(request.form['pessoas'])  # Número de pessoas
             
-            modelo = SimulacaoJurosCompostos(objetivo, taxa_juros, periodo_meses, num_participantes)
-            mensalidade_por_pessoa, mensalidade_total, montante_acumulado = modelo.simular()
+            modelo = SimulacaoJurosCompostos(objetivo, taxa_juros, periodo_meses, num_participantes,
+                                             atingir_objetivo=True)
+            mensalidade_por_pessoa, mensalidade_total, montante_acumulado = simular_em_cache(modelo)
 
             # Arredondar valores para exibição
             objetivo = round(objetivo, 2)
@@ -293,6 +584,52 @@ def juros():
 
 ####################################################################
 
+def _lista_numeros(texto: str, tipo) -> list:
+    '''Converte um texto como "6; 8,5; 10" ou "6 8.5 10" numa lista de números. Lança ValueError.'''
+    partes = texto.replace(';', ' ').split()
+    if not partes:
+        raise ValueError('Lista vazia.')
+    return [tipo(p.replace(',', '.')) for p in partes]
+
+@app.route('/juros/grade', methods=['GET', 'POST'])
+@login_required
+def juros_grade():
+    '''Compara vários cenários de juros compostos numa única requisição.
+
+    Recebe o objetivo e listas de taxas (% ao ano), períodos (meses) e números de pessoas,
+    e simula todas as combinações. Responde em JSON se `formato=json`.
+    '''
+    dados = request.values
+    if 'objetivo' not in dados:
+        return render_template('juros_grade.html')
+    quer_json = dados.get('formato') == 'json'
+    try:
+        objetivo = float(dados['objetivo'])
+        if not math.isfinite(objetivo):
+            raise ValueError('Objetivo inválido.')
+        taxas = [taxa_mensal(t) for t in _lista_numeros(dados.get('taxas', ''), float)]
+        periodos = _lista_numeros(dados.get('periodos', ''), int)
+        pessoas = _lista_numeros(dados.get('pessoas', ''), int)
+        if min(periodos) < 1 or max(periodos) > app.config['MAX_MESES_CRONOGRAMA']:
+            raise ValueError(f'Os períodos precisam estar entre 1 e {app.config["MAX_MESES_CRONOGRAMA"]} meses.')
+        if min(pessoas) < 1:
+            raise ValueError('O número de pessoas precisa ser positivo.')
+        cenarios = simular_grade(objetivo, taxas, periodos, pessoas)
+    except ValueError as erro:
+        if quer_json:
+            return jsonify(erro=str(erro)), 400
+        return render_template('juros_grade.html', error="Por favor, insira valores numéricos válidos.")
+
+    for c in cenarios:
+        # Convertendo de volta para percentual anual
+        c['taxa_juros'] = round(c['taxa_juros'] * 100 * 12, 4)
+    if quer_json:
+        return jsonify(objetivo=objetivo, cenarios=cenarios)
+    return render_template('juros_grade.html', objetivo=objetivo, cenarios=cenarios,
+                           taxas=dados.get('taxas'), periodos=dados.get('periodos'), pessoas=dados.get('pessoas'))
+
+####################################################################
+
 @app.route('/simulacao_sem_rendimentos', methods=['GET', 'POST'])
 @login_required
 def simulacao_sem_rendimentos():
@@ -305,7 +642,7 @@ def simulacao_sem_rendimentos():
             return render_template('simulacao_sem_rendimentos.html', error="Por favor, insira valores numéricos válidos.")
 
         modelo = SimulacaoSemRendimento(objetivo, num_parcelas, num_participantes)
-        mensalidade_por_participante, mensalidade_total, montante_acumulado = modelo.simular()
+        mensalidade_por_participante, mensalidade_total, montante_acumulado = simular_em_cache(modelo)
 
         # Arredondar valores para exibição
         objetivo = round(objetivo, 2)
@@ -325,6 +662,54 @@ def simulacao_sem_rendimentos():
 
     return render_template('simulacao_sem_rendimentos.html')
 
+####################################################################
+
+@app.route('/simulacao/cronograma', methods=['GET'])
+@login_required
+def cronograma_simulacao():
+    '''Baixa a evolução mês a mês de uma simulação, gerada aos poucos enquanto é enviada.
+
+    Parâmetros (na URL):
+        - tipo: 'juros' (padrão) ou 'sem_rendimentos'.
+        - objetivo, periodo (meses) e pessoas; para 'juros', também taxa (% ao ano).
+        - formato: 'csv' (padrão) ou 'json'.
+    '''
+    dados = request.args
+    tipo = dados.get('tipo', 'juros')
+    formato = dados.get('formato', 'csv')
+    try:
+        objetivo = float(dados['objetivo'])
+        periodo_meses = int(dados['periodo'])
+        num_participantes = int(dados['pessoas'])
+        if not 1 <= periodo_meses <= app.config['MAX_MESES_CRONOGRAMA'] or num_participantes < 1:
+            raise ValueError
+        if tipo == 'juros':
+            taxa_juros = taxa_mensal(dados['taxa'])  # Convertendo para taxa mensal
+            modelo = SimulacaoJurosCompostos(objetivo, taxa_juros, periodo_meses, num_participantes,
+                                             atingir_objetivo=True)
+        elif tipo == 'sem_rendimentos':
+            modelo = SimulacaoSemRendimento(objetivo, periodo_meses, num_participantes)
+        else:
+            raise ValueError
+    except (KeyError, ValueError):
+        return jsonify(erro='Parâmetros inválidos.'), 400
+    colunas = modelo.COLUNAS_CRONOGRAMA
+
+    def gerar_json():
+        separador = '['
+        for linha in modelo.cronograma():
+            yield separador + json.dumps({c: round(v, 2) for c, v in linha.items()})
+            separador = ','
+        yield '[]' if separador == '[' else ']'
+
+    if formato == 'json':
+        return Response(gerar_json(), mimetype='application/json')
+    if formato != 'csv':
+        return jsonify(erro='Formato inválido.'), 400
+    linhas = ([linha['mes']] + [f'{linha[c]:.2f}' for c in colunas[1:]] for linha in modelo.cronograma())
+    return Response(csv_em_blocos(colunas, linhas), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=cronograma_{tipo}.csv'})
+
 
 
 
@@ -392,14 +777,15 @@ def juros_e_planilha():
 
             # Dados da simulação de juros
             objetivo = float(request.form['objetivo'])
-            taxa_juros = float(request.form['taxa']) / 100 / 12
+            taxa_juros = taxa_mensal(request.form['taxa'])
             # O +1 é pra contar pelo menos 1 mês
             periodo_meses = datas.diferenca_meses(datetime_ini, datetime_fim) + 1
             num_participantes = int(request.form['pessoas'])
             
             # Simulação de juros
-            modelo = SimulacaoJurosCompostos(objetivo, taxa_juros, periodo_meses, num_participantes)
-            mensalidade_por_pessoa, mensalidade_total, montante_acumulado = modelo.simular()
+            modelo = SimulacaoJurosCompostos(objetivo, taxa_juros, periodo_meses, num_participantes,
+                                             atingir_objetivo=True)
+            mensalidade_por_pessoa, mensalidade_total, montante_acumulado = simular_em_cache(modelo)
 
             # Arredondar valores para exibição
             objetivo = round(objetivo, 2)
@@ -435,5 +821,6 @@ def juros_e_planilha():
 @app.route('/logout')
 @login_required  # TODO: Não precisa estar logado para deslogar
 def logout():
+    User.invalidar_cache(current_user.id)
     logout_user()
     return redirect(url_for('index'))
@@ -0,0 +1,48 @@
+'''Compara a memória ocupada por lançamentos com e sem __slots__.
+
+Uso (a partir da pasta do projeto):
+    python -m benchmarks.memoria_modelos [quantidade]
+'''
+import sys
+import tracemalloc
+
+from models.lancamentos import Lancamento
+
+
+class LancamentoComDict:
+    '''Lançamento como era antes: atributos num __dict__ e o nome da tabela em cada objeto.'''
+
+    def __init__(self, id_planilha, participante, descricao, data, valor):
+        self._tabela = 'lancamentos'
+        self.id_planilha = id_planilha
+        self.participante = participante
+        self.descricao = descricao
+        self.data = data
+        self.valor = valor
+
+
+def medir(classe, quantidade: int) -> int:
+    '''Retorna quantos bytes são alocados para criar `quantidade` objetos de `classe`.'''
+    # Os valores são criados antes da medição para contar só os objetos.
+    descricoes = [f'Lançamento {i}' for i in range(quantidade)]
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    objetos = []
+    for i in range(quantidade):
+        objeto = classe(1, i % 20, descricoes[i], '2024-01-10', 10.0)
+        objeto.id = i
+        objetos += [objeto]
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    return usado
+
+
+if __name__ == '__main__':
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    com_dict = medir(LancamentoComDict, quantidade)
+    com_slots = medir(Lancamento, quantidade)
+    print(f'{quantidade} lançamentos')
+    print(f'  com __dict__:  {com_dict / 2**20:8.2f} MiB ({com_dict / quantidade:6.1f} bytes/objeto)')
+    print(f'  com __slots__: {com_slots / 2**20:8.2f} MiB ({com_slots / quantidade:6.1f} bytes/objeto)')
+    print(f'  economia:      {(com_dict - com_slots) / quantidade:6.1f} bytes/objeto '
+          f'({100 * (com_dict - com_slots) / com_dict:.0f}%)')
@@ -0,0 +1,30 @@
+'''Mede o tempo da simulação de Monte Carlo.
+
+Uso (a partir da pasta do projeto):
+    python -m benchmarks.monte_carlo [caminhos] [meses]
+'''
+import sys
+import time
+
+from simulacoes import SimulacaoMonteCarlo, np
+
+
+def medir(caminhos: int, meses: int, repeticoes: int = 5) -> float:
+    '''Retorna o menor tempo, em segundos, de `repeticoes` execuções de `distribuicao`.'''
+    simulacao = SimulacaoMonteCarlo(100_000, 0.008, 0.02, meses, 4, atingir_objetivo=True,
+                                    num_caminhos=caminhos, semente=42)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        simulacao.distribuicao()
+        tempos += [time.perf_counter() - inicio]
+    return min(tempos)
+
+
+if __name__ == '__main__':
+    caminhos = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    meses = int(sys.argv[2]) if len(sys.argv) > 2 else 360
+    if np is None:
+        print('NumPy não está instalado: a simulação usa o modo mês a mês, bem mais lento.')
+    tempo = medir(caminhos, meses, repeticoes=5 if np is not None else 1)
+    print(f'{caminhos} caminhos x {meses} meses: {tempo * 1000:.1f} ms')
@@ -0,0 +1,31 @@
+'''Mostra o plano de execução da consulta do painel de planilhas (SQL_PAINEL).
+
+Todas as tabelas devem ser lidas por índice (SEARCH), sem SCAN nem B-tree temporária.
+
+Uso (a partir da pasta do projeto):
+    python -m benchmarks.plano_painel [id_usuario]
+'''
+import sys
+
+from database.db import obter_conexao
+from models.planilhas import SQL_PAINEL
+
+
+def plano(id_usuario: int) -> list[str]:
+    '''Retorna as linhas do EXPLAIN QUERY PLAN da consulta do painel.'''
+    conn = obter_conexao()
+    try:
+        return [r[3] for r in conn.execute(f'EXPLAIN QUERY PLAN {SQL_PAINEL}', (id_usuario,))]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    linhas = plano(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
+    for linha in linhas:
+        print(linha)
+    problemas = [l for l in linhas if l.startswith('SCAN') or 'TEMP B-TREE' in l]
+    if problemas:
+        print(f'{len(problemas)} passo(s) sem índice.')
+        sys.exit(1)
+    print('Todos os passos usam índices.')
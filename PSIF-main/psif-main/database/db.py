@@ -1,6 +1,229 @@
+import queue
 import sqlite3
+import threading
 
-def obter_conexao():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+CAMINHO_BANCO = 'database.db'
+TAMANHO_POOL = 5
+
+# PRAGMAs aplicados em toda conexão nova.
+# WAL deixa as leituras seguirem enquanto outro processo escreve; busy_timeout
+# faz a escrita esperar a vez (em milissegundos) em vez de falhar com "database is locked".
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,  # Negativo: em KiB (~20 MB)
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+class ConexaoPool:
+    '''Conexão emprestada de um PoolConexoes.
+
+    Repassa tudo para a sqlite3.Connection original, mas `close()` devolve a
+    conexão ao pool em vez de fechá-la. Também pode ser usada com `with`:
+    faz commit (ou rollback, em caso de exceção) e devolve a conexão ao sair.
+    '''
+
+    def __init__(self, pool: 'PoolConexoes', conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, nome):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Conexão já devolvida ao pool.')
+        return getattr(self._conn, nome)
+
+    def close(self):
+        '''Devolve a conexão ao pool. Chamar mais de uma vez não tem efeito.'''
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.devolver(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        try:
+            if self._conn is not None:
+                if tipo is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Garante a devolução de conexões esquecidas abertas. O coletor de lixo pode rodar
+        # isto enquanto a mesma thread segura a trava do pool, então a conexão só é posta
+        # numa fila (SimpleQueue.put pode ser chamado nessas condições) e o pool a recolhe depois.
+        try:
+            if self._conn is not None:
+                conn, self._conn = self._conn, None
+                self._pool._abandonadas.put(conn)
+        except Exception:
+            pass
+
+
+class PoolConexoes:
+    '''Pool de conexões SQLite reutilizáveis.
+
+    Parâmetros:
+        - caminho: o arquivo do banco de dados.
+        - tamanho: quantas conexões ociosas o pool mantém abertas. Se todas
+          estiverem em uso, uma nova é aberta e, ao ser devolvida com o pool
+          cheio, é fechada.
+        - pragmas: os PRAGMAs aplicados em cada conexão nova. Por padrão, PRAGMAS.
+        - inicializar: função opcional chamada com cada conexão nova, depois dos PRAGMAs.
+    '''
+
+    def __init__(self, caminho: str = CAMINHO_BANCO, tamanho: int = TAMANHO_POOL,
+                 pragmas: dict | None = None, inicializar=None):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.inicializar = inicializar
+        self._ociosas = []
+        self._abandonadas = queue.SimpleQueue()  # Conexões devolvidas por ConexaoPool.__del__
+        self._trava = threading.Lock()
+        self._contadores = {'abertas': 0, 'reutilizadas': 0, 'descartadas': 0, 'em_uso': 0}
+
+    def _abrir(self) -> sqlite3.Connection:
+        '''Abre uma nova conexão com o banco.'''
+        # A conexão pode ser usada por outra thread depois de devolvida ao pool.
+        conn = sqlite3.connect(self.caminho, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            self._inicializar(conn)
+        except BaseException:
+            conn.close()
+            raise
+        with self._trava:
+            self._contadores['abertas'] += 1
+        return conn
+
+    def _inicializar(self, conn: sqlite3.Connection):
+        '''Aplica os PRAGMAs configurados e chama a função `inicializar`, se houver.'''
+        for nome, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nome} = {valor}').fetchall()
+        if self.inicializar is not None:
+            self.inicializar(conn)
+
+    @staticmethod
+    def _saudavel(conn: sqlite3.Connection) -> bool:
+        '''Verifica se a conexão ainda responde.'''
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._trava:
+            self._contadores['descartadas'] += 1
+
+    def _recolher_abandonadas(self):
+        '''Devolve ao pool as conexões que foram esquecidas sem `close()`.'''
+        while True:
+            try:
+                conn = self._abandonadas.get_nowait()
+            except queue.Empty:
+                return
+            self.devolver(conn)
+
+    def obter(self) -> ConexaoPool:
+        '''Empresta uma conexão do pool, abrindo uma nova se necessário.'''
+        self._recolher_abandonadas()
+        while True:
+            with self._trava:
+                conn = self._ociosas.pop() if self._ociosas else None
+            if conn is None:
+                conn = self._abrir()
+                break
+            if self._saudavel(conn):
+                with self._trava:
+                    self._contadores['reutilizadas'] += 1
+                break
+            self._descartar(conn)
+        with self._trava:
+            self._contadores['em_uso'] += 1
+        return ConexaoPool(self, conn)
+
+    def devolver(self, conn: sqlite3.Connection):
+        '''Recebe de volta uma conexão emprestada por `obter`.'''
+        with self._trava:
+            self._contadores['em_uso'] -= 1
+        try:
+            # Transações pendentes não podem vazar para o próximo usuário.
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+        with self._trava:
+            if len(self._ociosas) < self.tamanho:
+                self._ociosas.append(conn)
+                return
+        self._descartar(conn)
+
+    def fechar(self):
+        '''Fecha todas as conexões ociosas.'''
+        self._recolher_abandonadas()
+        with self._trava:
+            ociosas, self._ociosas = self._ociosas, []
+        for conn in ociosas:
+            self._descartar(conn)
+
+    def estatisticas(self) -> dict:
+        '''Retorna os contadores do pool.
+
+        Retorna:
+            Um dicionário com as conexões abertas, reutilizadas, descartadas,
+            em uso e ociosas no momento.
+        '''
+        self._recolher_abandonadas()
+        with self._trava:
+            estatisticas = dict(self._contadores)
+            estatisticas['ociosas'] = len(self._ociosas)
+        return estatisticas
+
+
+pool = PoolConexoes()
+
+
+def configurar_pool(caminho: str | None = None, tamanho: int | None = None,
+                    pragmas: dict | None = None, inicializar=None):
+    '''Altera a configuração do pool global.
+
+    Parâmetros:
+        - caminho: o arquivo do banco de dados.
+        - tamanho: quantas conexões ociosas manter.
+        - pragmas: PRAGMAs a acrescentar ou substituir nos atuais. Use o valor None para remover um.
+        - inicializar: função chamada com cada conexão nova.
+
+    As conexões ociosas são fechadas para que as próximas usem a nova configuração.
+    '''
+    if caminho is not None:
+        pool.caminho = caminho
+    if tamanho is not None:
+        pool.tamanho = tamanho
+    if pragmas is not None:
+        for nome, valor in pragmas.items():
+            if valor is None:
+                pool.pragmas.pop(nome, None)
+            else:
+                pool.pragmas[nome] = valor
+    if inicializar is not None:
+        pool.inicializar = inicializar
+    pool.fechar()
+
+
+def obter_conexao() -> ConexaoPool:
+    '''Obtém uma conexão do pool global. `close()` devolve a conexão ao pool.'''
+    return pool.obter()
@@ -1,4 +1,4 @@
-CREATE TABLE planilhas (
+CREATE TABLE IF NOT EXISTS planilhas (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     id_usuario INTEGER NOT NULL,
     descricao TEXT NOT NULL,
@@ -9,7 +9,7 @@ CREATE TABLE planilhas (
     FOREIGN KEY (id_usuario) REFERENCES usuarios
 );
 
-CREATE TABLE lancamentos (
+CREATE TABLE IF NOT EXISTS lancamentos (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     id_planilha INTEGER NOT NULL,
     id_participante INTEGER NOT NULL,
@@ -21,7 +21,7 @@ CREATE TABLE lancamentos (
     FOREIGN KEY (id_participante) REFERENCES participantes
 );
 
-CREATE TABLE participantes (
+CREATE TABLE IF NOT EXISTS participantes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     id_planilha INTEGER NOT NULL,
     nome TEXT NOT NULL,
@@ -30,7 +30,7 @@ CREATE TABLE participantes (
     FOREIGN KEY (id_planilha) REFERENCES planilhas
 );
 
-CREATE TABLE usuarios (
+CREATE TABLE IF NOT EXISTS usuarios (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     nome TEXT NOT NULL,
     email TEXT NOT NULL,
@@ -38,7 +38,7 @@ CREATE TABLE usuarios (
 );
 
 
-CREATE TABLE eventos (
+CREATE TABLE IF NOT EXISTS eventos (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     nome TEXT NOT NULL,
     contato TEXT NOT NULL,
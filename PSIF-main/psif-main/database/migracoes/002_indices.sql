@@ -0,0 +1,16 @@
+-- Índices para as consultas mais frequentes.
+
+-- Lançamentos de uma planilha, em ordem de data (listagens e gráfico).
+CREATE INDEX IF NOT EXISTS idx_lancamentos_planilha_data ON lancamentos (id_planilha, data);
+
+-- Lançamentos de um participante.
+CREATE INDEX IF NOT EXISTS idx_lancamentos_participante ON lancamentos (id_participante);
+
+CREATE INDEX IF NOT EXISTS idx_participantes_planilha ON participantes (id_planilha);
+
+CREATE INDEX IF NOT EXISTS idx_planilhas_usuario ON planilhas (id_usuario);
+
+CREATE INDEX IF NOT EXISTS idx_eventos_usuario ON eventos (id_usuario);
+
+-- Falha (e a migração é desfeita) se já houver e-mails repetidos no banco.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios (email);
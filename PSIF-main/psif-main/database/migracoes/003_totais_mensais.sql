@@ -0,0 +1,55 @@
+-- Totais mensais dos lançamentos por planilha e participante, mantidos por gatilhos.
+-- O gráfico lê direto daqui em vez de somar os lançamentos a cada acesso.
+
+CREATE TABLE IF NOT EXISTS totais_mensais (
+    id_planilha INTEGER NOT NULL,
+    id_participante INTEGER NOT NULL,
+    mes TEXT NOT NULL,  -- 'AAAA-MM'
+    total REAL NOT NULL,
+    quantidade INTEGER NOT NULL,  -- Quantos lançamentos compõem o total
+
+    PRIMARY KEY (id_planilha, id_participante, mes)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS totais_mensais_inserir AFTER INSERT ON lancamentos
+BEGIN
+    INSERT INTO totais_mensais (id_planilha, id_participante, mes, total, quantidade)
+    VALUES (NEW.id_planilha, NEW.id_participante, substr(NEW.data, 1, 7), NEW.valor, 1)
+    ON CONFLICT (id_planilha, id_participante, mes)
+    DO UPDATE SET total = total + excluded.total, quantidade = quantidade + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS totais_mensais_excluir AFTER DELETE ON lancamentos
+BEGIN
+    UPDATE totais_mensais
+    SET total = total - OLD.valor, quantidade = quantidade - 1
+    WHERE id_planilha = OLD.id_planilha AND id_participante = OLD.id_participante
+      AND mes = substr(OLD.data, 1, 7);
+    DELETE FROM totais_mensais
+    WHERE id_planilha = OLD.id_planilha AND id_participante = OLD.id_participante
+      AND mes = substr(OLD.data, 1, 7) AND quantidade <= 0;
+END;
+
+-- Uma alteração equivale a excluir o lançamento antigo e inserir o novo.
+CREATE TRIGGER IF NOT EXISTS totais_mensais_alterar
+AFTER UPDATE OF id_planilha, id_participante, data, valor ON lancamentos
+BEGIN
+    UPDATE totais_mensais
+    SET total = total - OLD.valor, quantidade = quantidade - 1
+    WHERE id_planilha = OLD.id_planilha AND id_participante = OLD.id_participante
+      AND mes = substr(OLD.data, 1, 7);
+    DELETE FROM totais_mensais
+    WHERE id_planilha = OLD.id_planilha AND id_participante = OLD.id_participante
+      AND mes = substr(OLD.data, 1, 7) AND quantidade <= 0;
+    INSERT INTO totais_mensais (id_planilha, id_participante, mes, total, quantidade)
+    VALUES (NEW.id_planilha, NEW.id_participante, substr(NEW.data, 1, 7), NEW.valor, 1)
+    ON CONFLICT (id_planilha, id_participante, mes)
+    DO UPDATE SET total = total + excluded.total, quantidade = quantidade + 1;
+END;
+
+-- Preenche os totais dos lançamentos que já existem.
+DELETE FROM totais_mensais;
+INSERT INTO totais_mensais (id_planilha, id_participante, mes, total, quantidade)
+SELECT id_planilha, id_participante, substr(data, 1, 7), SUM(valor), COUNT(*)
+FROM lancamentos
+GROUP BY id_planilha, id_participante, substr(data, 1, 7);
@@ -0,0 +1,40 @@
+-- Versão de cada planilha, incrementada a cada alteração nela, nos seus
+-- participantes ou nos seus lançamentos. Usada como chave de cache.
+
+ALTER TABLE planilhas ADD COLUMN versao INTEGER NOT NULL DEFAULT 0;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_alterar
+AFTER UPDATE OF id_usuario, descricao, objetivo, data_ini, data_fim ON planilhas
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_lancamento_inserir AFTER INSERT ON lancamentos
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id = NEW.id_planilha;
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_lancamento_alterar AFTER UPDATE ON lancamentos
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id IN (OLD.id_planilha, NEW.id_planilha);
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_lancamento_excluir AFTER DELETE ON lancamentos
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id = OLD.id_planilha;
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_participante_inserir AFTER INSERT ON participantes
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id = NEW.id_planilha;
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_participante_alterar AFTER UPDATE ON participantes
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id IN (OLD.id_planilha, NEW.id_planilha);
+END;
+
+CREATE TRIGGER IF NOT EXISTS versao_planilha_participante_excluir AFTER DELETE ON participantes
+BEGIN
+    UPDATE planilhas SET versao = versao + 1 WHERE id = OLD.id_planilha;
+END;
@@ -0,0 +1,16 @@
+-- Estado das importações de lançamentos (ver importacao.py).
+-- Fica no banco para que qualquer processo do servidor possa informar o progresso,
+-- não só o que recebeu o arquivo e está importando.
+
+CREATE TABLE IF NOT EXISTS importacoes (
+    id TEXT PRIMARY KEY,
+    id_planilha INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    processadas INTEGER NOT NULL DEFAULT 0,
+    situacao TEXT NOT NULL,
+    importados INTEGER NOT NULL DEFAULT 0,
+    erros TEXT NOT NULL DEFAULT '[]',  -- Lista de mensagens em JSON
+    atualizada_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (id_planilha) REFERENCES planilhas
+);
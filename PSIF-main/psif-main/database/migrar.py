@@ -0,0 +1,92 @@
+import os
+import re
+import sqlite3
+
+from database.db import CAMINHO_BANCO, PRAGMAS
+
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migracoes')
+
+
+def listar_migracoes() -> list[tuple[int, str]]:
+    '''Retorna as migrações disponíveis como (versão, caminho), em ordem de versão.
+
+    Cada migração é um arquivo `NNN_descricao.sql` na pasta database/migracoes.
+    '''
+    migracoes = []
+    for nome in os.listdir(PASTA_MIGRACOES):
+        encontrado = re.match(r'^(\d+)_.*\.sql$', nome)
+        if encontrado:
+            migracoes += [(int(encontrado.group(1)), os.path.join(PASTA_MIGRACOES, nome))]
+    migracoes.sort()
+    return migracoes
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    '''Retorna a versão do esquema gravada no banco (PRAGMA user_version).'''
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def comandos(sql: str) -> list[str]:
+    '''Separa o texto de uma migração nos seus comandos SQL.
+
+    Usa sqlite3.complete_statement, então o ponto e vírgula dentro de gatilhos
+    (BEGIN ... END) não quebra o comando.
+    '''
+    separados = []
+    comando = ''
+    for linha in sql.splitlines(keepends=True):
+        comando += linha
+        if sqlite3.complete_statement(comando):
+            separados += [comando]
+            comando = ''
+    if comando.strip():
+        separados += [comando]
+    return separados
+
+
+def migrar(caminho: str = CAMINHO_BANCO) -> list[int]:
+    '''Aplica no banco as migrações que ainda não foram aplicadas.
+
+    Cada migração roda numa transação junto com a atualização da versão do esquema:
+    se falhar, nada dela fica no banco e as seguintes não são aplicadas.
+
+    Pode rodar em vários processos ao mesmo tempo (ex.: cada worker importando o app):
+    a transação é aberta com BEGIN IMMEDIATE e a versão é relida dentro dela, então
+    só um processo aplica cada migração e os outros esperam e a pulam.
+
+    Parâmetros:
+        - caminho: o arquivo do banco de dados.
+
+    Retorna:
+        As versões aplicadas agora.
+    '''
+    aplicadas = []
+    # isolation_level=None: as transações são controladas aqui, sem BEGIN/COMMIT implícitos.
+    conn = sqlite3.connect(caminho, timeout=PRAGMAS['busy_timeout'] / 1000, isolation_level=None)
+    try:
+        versao = versao_atual(conn)
+        for numero, arquivo in listar_migracoes():
+            if numero <= versao:
+                continue
+            with open(arquivo, encoding='utf-8') as f:
+                sql = f.read()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                # Outro processo pode ter aplicado a migração enquanto esperávamos a trava.
+                versao = versao_atual(conn)
+                if numero <= versao:
+                    conn.execute('ROLLBACK')
+                    continue
+                for comando in comandos(sql):
+                    conn.execute(comando)
+                conn.execute(f'PRAGMA user_version = {numero}')
+                conn.execute('COMMIT')
+            except sqlite3.Error as erro:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise Exception(f'Falha na migração {os.path.basename(arquivo)}: {erro}') from erro
+            versao = numero
+            aplicadas += [numero]
+    finally:
+        conn.close()
+    return aplicadas
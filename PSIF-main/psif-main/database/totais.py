@@ -0,0 +1,66 @@
+'''Verificação e reconstrução da tabela `totais_mensais`.
+
+Uso:
+    python -m database.totais            # Reconstrói a tabela inteira
+    python -m database.totais --verificar  # Só lista as divergências
+'''
+import sys
+
+from database.db import obter_conexao
+
+# Totais calculados a partir dos lançamentos, no mesmo formato de totais_mensais.
+SQL_TOTAIS_CALCULADOS = '''
+    SELECT id_planilha, id_participante, substr(data, 1, 7) AS mes, SUM(valor) AS total, COUNT(*) AS quantidade
+    FROM lancamentos
+    GROUP BY id_planilha, id_participante, mes
+'''
+
+# Diferença permitida entre somas de ponto flutuante.
+TOLERANCIA = 1e-6
+
+
+def verificar_totais() -> list[tuple]:
+    '''Compara `totais_mensais` com os lançamentos.
+
+    Retorna:
+        Uma lista de (id_planilha, id_participante, mes, total gravado, total calculado)
+        para cada total divergente. Totais ausentes aparecem como None.
+    '''
+    conn = obter_conexao()
+    try:
+        calculados = {tuple(r[:3]): (r[3], r[4]) for r in conn.execute(SQL_TOTAIS_CALCULADOS)}
+        gravados = {tuple(r[:3]): (r[3], r[4]) for r in conn.execute(
+            'SELECT id_planilha, id_participante, mes, total, quantidade FROM totais_mensais')}
+    finally:
+        conn.close()
+    divergencias = []
+    for chave in sorted(calculados.keys() | gravados.keys()):
+        gravado = gravados.get(chave)
+        calculado = calculados.get(chave)
+        if gravado is None or calculado is None or gravado[1] != calculado[1] \
+                or abs(gravado[0] - calculado[0]) > TOLERANCIA:
+            divergencias += [chave + (gravado and gravado[0], calculado and calculado[0])]
+    return divergencias
+
+
+def reconstruir_totais() -> int:
+    '''Recalcula `totais_mensais` inteira a partir dos lançamentos, numa única transação.
+
+    Retorna:
+        A quantidade de totais gravados.
+    '''
+    with obter_conexao() as conn:
+        conn.execute('DELETE FROM totais_mensais')
+        cursor = conn.execute('INSERT INTO totais_mensais (id_planilha, id_participante, mes, total, quantidade) '
+                              f'SELECT * FROM ({SQL_TOTAIS_CALCULADOS})')
+        return cursor.rowcount
+
+
+if __name__ == '__main__':
+    if '--verificar' in sys.argv[1:]:
+        divergencias = verificar_totais()
+        for d in divergencias:
+            print('Planilha {}, participante {}, {}: gravado {}, calculado {}'.format(*d))
+        print(f'{len(divergencias)} divergência(s).')
+        sys.exit(1 if divergencias else 0)
+    print(f'{reconstruir_totais()} total(is) reconstruído(s).')
@@ -0,0 +1,248 @@
+import csv
+import io
+import json
+import math
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database.db import obter_conexao
+from models.lancamentos import Lancamento
+from models.participantes import Participante
+
+COLUNAS = ('participante', 'data', 'descricao', 'valor')
+
+# Arquivos com mais linhas que isso são importados em segundo plano.
+LIMITE_SINCRONO = 1000
+
+# Quantos erros de validação guardar para mostrar ao usuário.
+MAX_ERROS = 50
+
+# Quantas importações terminadas manter para consulta do progresso.
+MAX_TAREFAS_TERMINADAS = 100
+
+# A cada quantas linhas validadas o progresso é gravado no banco.
+INTERVALO_PROGRESSO = 500
+
+# As importações em segundo plano rodam no processo que recebeu o arquivo; o estado
+# fica na tabela `importacoes`, que todos os processos consultam.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='importacao')
+
+
+class ErroImportacao(Exception):
+    '''Erro no formato do arquivo, que impede a importação como um todo.'''
+
+
+class Tarefa:
+    '''Uma importação de lançamentos, gravada na tabela `importacoes`.
+
+    Atributos:
+        - id: identificador para consultar o progresso.
+        - id_planilha: a planilha de destino.
+        - total: quantidade de linhas do arquivo.
+        - processadas: quantas linhas já foram validadas.
+        - situacao: 'pendente', 'validando', 'salvando', 'concluida' ou 'erro'.
+        - erros: mensagens de erro (no máximo MAX_ERROS).
+        - importados: quantidade de lançamentos salvos.
+    '''
+
+    def __init__(self, id_planilha: int, total: int):
+        self.id = uuid.uuid4().hex
+        self.id_planilha = id_planilha
+        self.total = total
+        self.processadas = 0
+        self.situacao = 'pendente'
+        self.erros = []
+        self.importados = 0
+
+    @property
+    def terminada(self) -> bool:
+        return self.situacao in ('concluida', 'erro')
+
+    def gravar(self):
+        '''Grava o estado atual no banco, criando o registro se for a primeira vez.'''
+        with obter_conexao() as conn:
+            conn.execute(
+                '''INSERT INTO importacoes (id, id_planilha, total, processadas, situacao, importados, erros)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (id) DO UPDATE SET
+                       processadas = excluded.processadas,
+                       situacao = excluded.situacao,
+                       importados = excluded.importados,
+                       erros = excluded.erros,
+                       atualizada_em = CURRENT_TIMESTAMP''',
+                (self.id, self.id_planilha, self.total, self.processadas, self.situacao,
+                 self.importados, json.dumps(self.erros)))
+
+    @classmethod
+    def carregar(cls, id: str) -> 'Tarefa | None':
+        '''Lê do banco a tarefa com o `id` informado ou retorna None.'''
+        conn = obter_conexao()
+        try:
+            registro = conn.execute(
+                '''SELECT id, id_planilha, total, processadas, situacao, importados, erros
+                   FROM importacoes WHERE id = ?''', (id,)).fetchone()
+        finally:
+            conn.close()
+        if registro is None:
+            return None
+        tarefa = cls(registro[1], registro[2])
+        tarefa.id = registro[0]
+        tarefa.processadas = registro[3]
+        tarefa.situacao = registro[4]
+        tarefa.importados = registro[5]
+        tarefa.erros = json.loads(registro[6])
+        return tarefa
+
+    def como_dict(self) -> dict:
+        '''Retorna o estado da tarefa para responder em JSON.'''
+        return {
+            'id': self.id,
+            'situacao': self.situacao,
+            'total': self.total,
+            'processadas': self.processadas,
+            'progresso': round(100 * self.processadas / self.total, 1) if self.total else 100.0,
+            'importados': self.importados,
+            'erros': list(self.erros),
+        }
+
+
+def ler_csv(conteudo: bytes) -> list[dict]:
+    '''Lê o arquivo CSV enviado e retorna as linhas como dicionários.
+
+    Aceita vírgula ou ponto e vírgula como separador e UTF-8 (com ou sem BOM) ou Latin-1.
+    O cabeçalho deve ter as colunas participante, data, descricao e valor, em qualquer ordem.
+
+    Lança ErroImportacao se o cabeçalho for inválido.
+    '''
+    try:
+        texto = conteudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = conteudo.decode('latin-1')
+    primeira_linha = texto.split('\n', 1)[0]
+    separador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+    leitor = csv.DictReader(io.StringIO(texto), delimiter=separador)
+    if leitor.fieldnames is None:
+        raise ErroImportacao('O arquivo está vazio.')
+    leitor.fieldnames = [c.strip().lower() for c in leitor.fieldnames]
+    faltando = [c for c in COLUNAS if c not in leitor.fieldnames]
+    if faltando:
+        raise ErroImportacao(f'Colunas ausentes no cabeçalho: {", ".join(faltando)}.')
+    return list(leitor)
+
+
+def _validar(tarefa: Tarefa, linhas: list[dict]) -> list[Lancamento]:
+    '''Valida as linhas e monta os lançamentos. Os erros ficam em `tarefa.erros`.'''
+    # Os participantes da planilha são carregados de uma vez e encontrados pelo id ou pelo nome.
+    # Ids e nomes ficam separados: um participante chamado "2" não pode ser confundido com o de id 2.
+    participantes = Participante.consultar('SELECT * FROM participantes WHERE id_planilha = ?',
+                                           (tarefa.id_planilha,))
+    por_id = {}
+    por_nome = {}
+    for p in participantes:
+        por_id[str(p.id)] = p.id
+        por_nome.setdefault(p.nome.strip().lower(), set()).add(p.id)
+
+    lancamentos = []
+    quantidade_erros = 0
+    for numero, linha in enumerate(linhas, start=2):  # A linha 1 é o cabeçalho
+        erros = []
+        chave = (linha['participante'] or '').strip().lower()
+        encontrados = set(por_nome.get(chave, ()))
+        if chave in por_id:
+            encontrados.add(por_id[chave])
+        participante = None
+        if not encontrados:
+            erros += [f'participante "{linha["participante"]}" não existe na planilha']
+        elif len(encontrados) > 1:
+            ids = ', '.join(str(i) for i in sorted(encontrados))
+            erros += [f'participante "{linha["participante"]}" corresponde a mais de um participante (ids {ids})']
+        else:
+            participante = encontrados.pop()
+        data = (linha['data'] or '').strip()
+        try:
+            # strptime aceita '2024-3-5'; grava sempre com zeros, pois os totais mensais
+            # e a ordenação dos lançamentos dependem do texto 'AAAA-MM-DD'.
+            data = datetime.strptime(data, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            erros += [f'data "{data}" não está no formato AAAA-MM-DD']
+        descricao = (linha['descricao'] or '').strip()
+        if not descricao:
+            erros += ['descrição vazia']
+        try:
+            valor = float((linha['valor'] or '').strip().replace(',', '.'))
+            # float() também aceita 'nan' e 'inf', que não são valores de lançamento.
+            if not math.isfinite(valor):
+                raise ValueError
+        except ValueError:
+            erros += [f'valor "{linha["valor"]}" não é um número']
+
+        if erros:
+            quantidade_erros += 1
+            if len(tarefa.erros) < MAX_ERROS:
+                tarefa.erros += [f'Linha {numero}: {"; ".join(erros)}.']
+        else:
+            lancamentos += [Lancamento(tarefa.id_planilha, participante, descricao, data, valor)]
+        tarefa.processadas += 1
+        if tarefa.processadas % INTERVALO_PROGRESSO == 0:
+            tarefa.gravar()
+
+    if quantidade_erros > len(tarefa.erros):
+        tarefa.erros += [f'... e mais {quantidade_erros - len(tarefa.erros)} linha(s) com erro.']
+    return lancamentos
+
+
+def _executar(tarefa: Tarefa, linhas: list[dict]):
+    '''Valida e salva os lançamentos. Se alguma linha tiver erro, nada é salvo.'''
+    try:
+        tarefa.situacao = 'validando'
+        tarefa.gravar()
+        lancamentos = _validar(tarefa, linhas)
+        if tarefa.erros:
+            tarefa.situacao = 'erro'
+            return
+        tarefa.situacao = 'salvando'
+        tarefa.gravar()
+        # Um único executemany numa única transação.
+        tarefa.importados = len(Lancamento.salvar_em_lote(lancamentos))
+        tarefa.situacao = 'concluida'
+    except Exception as erro:
+        tarefa.erros += [f'Falha ao importar: {erro}']
+        tarefa.situacao = 'erro'
+    finally:
+        tarefa.gravar()
+
+
+def _registrar(tarefa: Tarefa):
+    '''Grava a tarefa para consulta, descartando as terminadas mais antigas.'''
+    tarefa.gravar()
+    with obter_conexao() as conn:
+        conn.execute(
+            '''DELETE FROM importacoes
+               WHERE situacao IN ('concluida', 'erro')
+                 AND rowid NOT IN (SELECT rowid FROM importacoes
+                                   WHERE situacao IN ('concluida', 'erro')
+                                   ORDER BY rowid DESC LIMIT ?)''', (MAX_TAREFAS_TERMINADAS,))
+
+
+def importar_lancamentos(id_planilha: int, conteudo: bytes) -> Tarefa:
+    '''Importa os lançamentos de um CSV para a planilha.
+
+    Arquivos de até LIMITE_SINCRONO linhas são importados na hora. Os maiores são
+    importados em segundo plano; acompanhe por `obter_tarefa(tarefa.id)`.
+
+    Lança ErroImportacao se o cabeçalho for inválido.
+    '''
+    linhas = ler_csv(conteudo)
+    tarefa = Tarefa(id_planilha, len(linhas))
+    _registrar(tarefa)
+    if len(linhas) <= LIMITE_SINCRONO:
+        _executar(tarefa, linhas)
+    else:
+        _executor.submit(_executar, tarefa, linhas)
+    return tarefa
+
+
+def obter_tarefa(id_tarefa: str) -> Tarefa | None:
+    '''Retorna a tarefa de importação com o id informado ou None, em qualquer processo.'''
+    return Tarefa.carregar(id_tarefa)
@@ -1,11 +1,9 @@
-import sqlite3
+from database.migrar import migrar
 
-conn = sqlite3.connect('database.db')
+# Cria o banco ou atualiza um banco existente para a versão mais recente do esquema.
+aplicadas = migrar()
 
-SCHEMA = "database/schema.sql"
-
-with open (SCHEMA) as f:
-    conn.executescript(f.read())
-
-conn.commit()
-conn.close()
\ No newline at end of file
+if aplicadas:
+    print(f'Migrações aplicadas: {", ".join(str(v) for v in aplicadas)}')
+else:
+    print('O banco já está na versão mais recente.')
@@ -1,45 +1,96 @@
-import sqlite3
+from database.db import obter_conexao
+
+# Limite de parâmetros por consulta (SQLITE_MAX_VARIABLE_NUMBER nas versões antigas do SQLite).
+LIMITE_PARAMETROS = 999
+
+# Quantidade de registros lidos por vez em Base.consultar_iter.
+TAMANHO_LOTE = 500
+
 
 class Base:
-    def __init__(self, tabela: str):
-        '''Classe base para qualquer modelo.
+    '''Classe base para qualquer modelo.
 
-        Parâmetros:
-          - tabela: nome da tabela no banco de dados.
-          - atributos: list de atributos na ordem em que aparecem na tabela.
+    Todo modelo deve ser uma subclasse desta, definir `_tabela` (o nome da tabela no
+    banco) e sobrescrever os métodos abstratos. Os modelos declaram `__slots__` com os
+    seus atributos, para não carregar um `__dict__` em cada objeto.
+    '''
+    __slots__ = ('id',)
 
-        Todo modelo deve ser uma subclasse desta e sobrescrever os métodos abstratos.
-        '''
-        self._tabela = tabela
+    # Nome da tabela no banco. As subclasses devem sobrescrever.
+    _tabela: str = None
 
     @staticmethod
     def _obter_conexao():
-        '''Obtém uma conexão com o banco de dados.'''
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+        '''Obtém uma conexão do pool de conexões. `close()` devolve a conexão ao pool.'''
+        return obter_conexao()
 
     def salvar(self) -> int:
         '''Salva no banco e retorna o id gerado.'''
-        conn = self._obter_conexao()
-        cursor = conn.cursor()
         atributos = self._atributos()
         interrogacoes = ('?, ' * len(atributos))[:-2]
         colunas = (', '.join(list(atributos.keys())))
         valores = list(atributos.values())
-        cursor.execute(f'INSERT INTO {self._tabela} ({colunas}) VALUES ({interrogacoes})',
-                    valores)
-        conn.commit()
-        self.id = cursor.lastrowid  # Obtém o id gerado
-        conn.close()
+        conn = self._obter_conexao()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'INSERT INTO {self._tabela} ({colunas}) VALUES ({interrogacoes})',
+                        valores)
+            conn.commit()
+            self.id = cursor.lastrowid  # Obtém o id gerado
+        finally:
+            conn.close()
         return self.id  # Retorna o id gerado
     
+    @classmethod
+    def salvar_em_lote(cls, objetos) -> list[int]:
+        '''Salva vários objetos numa única transação e retorna os ids gerados, na mesma ordem.
+
+        Usa `executemany`, então há um único commit para o lote todo. A tabela precisa
+        gerar os ids sozinha (INTEGER PRIMARY KEY AUTOINCREMENT), como em
+        `lancamentos`, `participantes` e `planilhas`.
+
+        Parâmetros:
+            - objetos: Os objetos a salvar. Todos devem ser instâncias desta classe.
+        '''
+        objetos = list(objetos)
+        if not objetos:
+            return []
+        atributos = objetos[0]._atributos()
+        interrogacoes = ('?, ' * len(atributos))[:-2]
+        colunas = (', '.join(list(atributos.keys())))
+        valores = [list(o._atributos().values()) for o in objetos]
+        conn = cls._obter_conexao()
+        try:
+            # IMMEDIATE reserva a escrita: ninguém mais insere até o commit,
+            # então os ids gerados são consecutivos a partir do último.
+            conn.execute('BEGIN IMMEDIATE')
+            ultimo_id = conn.execute(
+                f'SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0), '
+                f'COALESCE(MAX(id), 0)) FROM {cls._tabela}', (cls._tabela,)).fetchone()[0]
+            conn.executemany(f'INSERT INTO {cls._tabela} ({colunas}) VALUES ({interrogacoes})',
+                             valores)
+            novo_ultimo_id = conn.execute(f'SELECT MAX(id) FROM {cls._tabela}').fetchone()[0]
+            if novo_ultimo_id != ultimo_id + len(objetos):
+                raise Exception(f'Os ids gerados em {cls._tabela} não são consecutivos.')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        ids = list(range(ultimo_id + 1, ultimo_id + len(objetos) + 1))
+        for objeto, id in zip(objetos, ids):
+            objeto.id = id
+        return ids
+
     def excluir(self):
         '''Exclui o registro do banco.'''
         conn = self._obter_conexao()
-        conn.execute(f'DELETE FROM {self._tabela} WHERE id = ?', (self.id,))
-        conn.commit()
-        conn.close()
+        try:
+            conn.execute(f'DELETE FROM {self._tabela} WHERE id = ?', (self.id,))
+            conn.commit()
+        finally:
+            conn.close()
 
     def _atributos(self) -> dict:
         '''Retorna um dicionário contendo o nome e o valor das colunas na mesma ordem da tabela.
@@ -54,23 +105,95 @@ class Base:
         raise MetodoAbstrato(cls._carregar_registro.__name__)
 
     @classmethod
-    def consultar(cls, sqlquery: str, parametros: tuple = tuple()) -> list['Base']:
+    def consultar(cls, sqlquery: str, parametros: tuple = tuple(), conexao=None) -> list['Base']:
         '''Executa uma consulta SQL e retorna os objetos.
         
         Parâmetros:
             - sqlquery: A consulta SQL a executar.
             - parametros: Os parâmetros para o método execute da conexão com o banco de dados.
+            - conexao: Uma conexão já aberta para reaproveitar. Nesse caso ela não é devolvida ao pool.
         
         Retorna:
             A lista de objetos encontrados no banco.'''
-        conn = cls._obter_conexao()
-        dados = conn.execute(sqlquery, parametros).fetchall()
+        conn = conexao if conexao is not None else cls._obter_conexao()
+        try:
+            dados = conn.execute(sqlquery, parametros).fetchall()
+        finally:
+            if conexao is None:
+                conn.close()
         objetos = []
         for registro in dados:
             objeto = cls._carregar_registro(registro)
             objetos += [objeto]
         return objetos
 
+    @classmethod
+    def consultar_iter(cls, sqlquery: str, parametros: tuple = tuple(), tamanho_lote: int = TAMANHO_LOTE):
+        '''Como `consultar`, mas retorna um gerador que carrega os objetos aos poucos.
+
+        Os registros são lidos com `fetchmany` em lotes de `tamanho_lote`. A conexão é
+        devolvida ao pool quando o gerador termina ou é abandonado (fechado ou coletado).
+
+        Parâmetros:
+            - sqlquery: A consulta SQL a executar.
+            - parametros: Os parâmetros para o método execute da conexão com o banco de dados.
+            - tamanho_lote: Quantos registros ler do banco por vez.
+
+        Retorna:
+            Um gerador com os objetos encontrados no banco.'''
+        for registro in cls._iterar_registros(sqlquery, parametros, tamanho_lote):
+            yield cls._carregar_registro(registro)
+
+    @classmethod
+    def _iterar_registros(cls, sqlquery: str, parametros: tuple = tuple(), tamanho_lote: int = TAMANHO_LOTE):
+        '''Gerador com os registros brutos de uma consulta, lidos em lotes de `tamanho_lote`.
+
+        A conexão é devolvida ao pool quando o gerador termina ou é abandonado.
+        '''
+        conn = cls._obter_conexao()
+        cursor = None
+        try:
+            cursor = conn.execute(sqlquery, parametros)
+            while True:
+                registros = cursor.fetchmany(tamanho_lote)
+                if not registros:
+                    break
+                yield from registros
+        finally:
+            if cursor is not None:
+                cursor.close()
+            conn.close()
+
+    @classmethod
+    def encontrar_varios(cls, ids) -> dict:
+        '''Encontra vários registros pelos seus ids.
+
+        Os ids são divididos em lotes de até LIMITE_PARAMETROS consultas `IN (...)`,
+        todas na mesma conexão.
+
+        Parâmetros:
+            - ids: Os ids a buscar. Ids repetidos são buscados uma vez só.
+
+        Retorna:
+            Um dicionário de id para objeto. Os ids não encontrados ficam de fora.
+        '''
+        ids = list(dict.fromkeys(ids))
+        encontrados = {}
+        if not ids:
+            return encontrados
+        conn = cls._obter_conexao()
+        try:
+            for inicio in range(0, len(ids), LIMITE_PARAMETROS):
+                lote = ids[inicio:inicio + LIMITE_PARAMETROS]
+                interrogacoes = ('?, ' * len(lote))[:-2]
+                objetos = cls.consultar(f'SELECT * FROM {cls._tabela} WHERE id IN ({interrogacoes})',
+                                        tuple(lote), conexao=conn)
+                for objeto in objetos:
+                    encontrados[objeto.id] = objeto
+        finally:
+            conn.close()
+        return encontrados
+
     def encontrar(cls, id: int) -> 'Base | None':
         '''Encontra um registro baseado no `id`.
         Método abstrato. Deve ser sobrescrito nas subclasses.'''
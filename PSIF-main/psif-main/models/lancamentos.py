@@ -13,8 +13,11 @@ class Lancamento(Base):
             - data: A data em que ocorreu o lançamento.
             - valor: O valor do lançamento. Pode assumir valores negativos para indicar saques, por exemplo.
     '''
+    __slots__ = ('id_planilha', 'participante', 'descricao', 'data', 'valor')
+
+    _tabela = 'lancamentos'
+
     def __init__(self, id_planilha, participante, descricao, data, valor):
-        super().__init__(tabela='lancamentos')
         self.id_planilha = id_planilha
         self.participante = participante
         self.descricao = descricao
@@ -70,3 +73,46 @@ class Lancamento(Base):
             return None
         # Erro
         raise Exception(f'Há mais de um lançamento com id={id}.')
+
+    @classmethod
+    def pagina(cls, id_planilha: int, tamanho: int,
+               apos: tuple[str, int] | None = None) -> tuple[list['Lancamento'], tuple[str, int] | None]:
+        '''Retorna uma página dos lançamentos da planilha, em ordem de data e id.
+
+        Usa paginação por chave (keyset): em vez de OFFSET, a consulta continua a partir
+        do último (data, id) visto, usando o índice (id_planilha, data). O custo de cada
+        página não depende de quantas vieram antes.
+
+        Parâmetros:
+            - id_planilha: O id da planilha.
+            - tamanho: Quantidade máxima de lançamentos na página.
+            - apos: O (data, id) do último lançamento da página anterior. None para a primeira.
+
+        Retorna:
+            Os lançamentos da página e o (data, id) para pedir a próxima, ou None se não houver.
+        '''
+        if apos is None:
+            lancamentos = cls.consultar(
+                'SELECT * FROM lancamentos WHERE id_planilha = ? ORDER BY data, id LIMIT ?',
+                (id_planilha, tamanho + 1))
+        else:
+            lancamentos = cls.consultar(
+                'SELECT * FROM lancamentos WHERE id_planilha = ? AND (data, id) > (?, ?) ORDER BY data, id LIMIT ?',
+                (id_planilha, apos[0], apos[1], tamanho + 1))
+        # Um lançamento a mais indica que existe uma próxima página.
+        if len(lancamentos) <= tamanho:
+            return lancamentos, None
+        lancamentos = lancamentos[:tamanho]
+        ultimo = lancamentos[-1]
+        return lancamentos, (ultimo.data, ultimo.id)
+
+    @staticmethod
+    def codificar_cursor(cursor: tuple[str, int]) -> str:
+        '''Converte o (data, id) de `pagina` em texto para usar na URL.'''
+        return f'{cursor[0]}_{cursor[1]}'
+
+    @staticmethod
+    def decodificar_cursor(texto: str) -> tuple[str, int]:
+        '''Converte de volta o texto de `codificar_cursor`. Lança ValueError se for inválido.'''
+        data, id = texto.rsplit('_', 1)
+        return data, int(id)
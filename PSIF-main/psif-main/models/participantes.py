@@ -11,8 +11,11 @@ class Participante(Base):
         - nome: O nome do participante.
         - contato: Um telefone, e-mail, etc.
     '''
+    __slots__ = ('id_planilha', 'nome', 'contato')
+
+    _tabela = 'participantes'
+
     def __init__(self, id_planilha: int, nome: str, contato: str):
-        super().__init__(tabela='participantes')
         self.id_planilha = id_planilha
         self.nome = nome
         self.contato = contato
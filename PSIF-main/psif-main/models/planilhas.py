@@ -1,10 +1,26 @@
-from datetime import datetime
-
 from models.base import Base
 
 from models.lancamentos import Lancamento
 from models.participantes import Participante
-from util.datas import diferenca_meses
+from simulacoes import SimulacaoJurosCompostos, simular_em_cache
+from util.agregacao import Conciliacao, MatrizMensal, agregar_por_mes, conciliar, rotulos_meses
+from util.cache import cache_planilhas
+from util.datas import indice_mes
+
+# Resumo de todas as planilhas de um usuário numa única consulta (ver Planilha.painel).
+# Cada parte usa um índice: idx_planilhas_usuario, a chave de totais_mensais,
+# idx_participantes_planilha e idx_lancamentos_planilha_data. Confira o plano com
+# `python -m benchmarks.plano_painel`.
+SQL_PAINEL = '''SELECT pl.id, pl.id_usuario, pl.descricao, pl.objetivo, pl.data_ini, pl.data_fim, pl.versao,
+                       (SELECT COUNT(*) FROM participantes pa WHERE pa.id_planilha = pl.id),
+                       COALESCE(SUM(t.total), 0),
+                       (SELECT l.data FROM lancamentos l WHERE l.id_planilha = pl.id
+                        ORDER BY l.data DESC LIMIT 1)
+                FROM planilhas pl
+                LEFT JOIN totais_mensais t ON t.id_planilha = pl.id
+                WHERE pl.id_usuario = ?
+                GROUP BY pl.id
+                ORDER BY pl.id'''
 
 class Planilha(Base):
     '''Uma planilha.
@@ -18,9 +34,15 @@ class Planilha(Base):
         - data_fim: Data de fim do investimento.
         - lancamentos: A lista de lançamentos ocorridos até o momento.
         - participantes: A lista de participantes.
+        - versao: Incrementada pelo banco a cada alteração na planilha, nos participantes
+          ou nos lançamentos. Serve de chave para o cache.
     '''
+    __slots__ = ('id_usuario', 'descricao', 'objetivo', 'data_ini', 'data_fim',
+                 'lancamentos', 'participantes', 'versao')
+
+    _tabela = 'planilhas'
+
     def __init__(self, id_usuario, descricao, objetivo, data_ini, data_fim, lancamentos=[], participantes=[]):
-        super().__init__(tabela='planilhas')
         self.id_usuario = id_usuario
         self.descricao = descricao
         self.objetivo = objetivo
@@ -28,23 +50,65 @@ class Planilha(Base):
         self.data_fim = data_fim
         self.lancamentos = lancamentos
         self.participantes = participantes
+        self.versao = 0
+
+    RELACOES = ('lancamentos', 'participantes')
 
     @classmethod
     def find(cls, id: int, carregar_lancamentos: bool = True,
-                carregar_participantes: bool = True) -> 'Planilha | None':
-        '''Retorna a Planilha com o `id` informado ou None, caso não encontre.'''
-        res = cls.consultar('SELECT * FROM planilhas WHERE id = ?', (id,))
-        if len(res) == 0:
-            return None
-        if len(res) > 1:
-            raise Exception(f'find({id}) retornou {len(res)} resultados.')
-        p = res[0]
-        if carregar_lancamentos:
-            p.lancamentos = Lancamento.consultar('SELECT * FROM lancamentos WHERE id_planilha = ?', (p.id,))
-        if carregar_participantes:
-            p.participantes = Participante.consultar('SELECT * FROM participantes WHERE id_planilha = ?', (p.id,))
+                carregar_participantes: bool = True, carregar=None) -> 'Planilha | None':
+        '''Retorna a Planilha com o `id` informado ou None, caso não encontre.
+
+        A planilha e as relações pedidas são lidas na mesma conexão, uma consulta por tabela.
+
+        Parâmetros:
+            - id: O id da planilha.
+            - carregar_lancamentos, carregar_participantes: quais relações carregar.
+            - carregar: alternativa aos dois anteriores. Uma coleção com os nomes das
+              relações a carregar, por exemplo `carregar=('participantes',)`.
+              Se informado, tem prioridade sobre os parâmetros booleanos.
+        '''
+        if carregar is None:
+            carregar = []
+            if carregar_lancamentos:
+                carregar += ['lancamentos']
+            if carregar_participantes:
+                carregar += ['participantes']
+        else:
+            carregar = list(carregar)
+
+        conn = cls._obter_conexao()
+        try:
+            res = cls.consultar('SELECT * FROM planilhas WHERE id = ?', (id,), conexao=conn)
+            if len(res) == 0:
+                return None
+            if len(res) > 1:
+                raise Exception(f'find({id}) retornou {len(res)} resultados.')
+            p = res[0]
+            p.lancamentos = []
+            p.participantes = []
+            p.carregar_relacoes(carregar, conexao=conn)
+        finally:
+            conn.close()
         return p
 
+    def carregar_relacoes(self, carregar, conexao=None):
+        '''Carrega do banco as relações informadas (`'lancamentos'` e/ou `'participantes'`).
+
+        Parâmetros:
+            - carregar: Os nomes das relações a carregar.
+            - conexao: Uma conexão já aberta para reaproveitar.
+        '''
+        for relacao in carregar:
+            if relacao not in self.RELACOES:
+                raise ValueError(f'Relação desconhecida: {relacao}.')
+        if 'lancamentos' in carregar:
+            self.lancamentos = Lancamento.consultar('SELECT * FROM lancamentos WHERE id_planilha = ?',
+                                                    (self.id,), conexao=conexao)
+        if 'participantes' in carregar:
+            self.participantes = Participante.consultar('SELECT * FROM participantes WHERE id_planilha = ?',
+                                                        (self.id,), conexao=conexao)
+
     def _atributos(self) -> dict:
         '''Retorna o dicionário dos atributos na mesma ordem da tabela `planilha`.
         É usado na classe models.base.Modelo para salvar as entidades no banco.
@@ -72,6 +136,8 @@ class Planilha(Base):
         data_fim = registro[5]
         p = cls(id_usuario, descricao, objetivo, data_ini, data_fim)
         p.id = id
+        if len(registro) > 6:
+            p.versao = registro[6]
         return p
 
     @classmethod
@@ -96,39 +162,217 @@ class Planilha(Base):
         # Erro
         raise Exception(f'Há mais de uma planilha com id={id}.')
 
+    @classmethod
+    def marcador_alteracao(cls, id: int, id_usuario: int) -> str | None:
+        '''Retorna um texto que muda sempre que a planilha muda, sem carregá-la.
+
+        Retorna None se a planilha não existir ou não for do usuário `id_usuario`.
+        '''
+        conn = cls._obter_conexao()
+        try:
+            registro = conn.execute('SELECT versao FROM planilhas WHERE id = ? AND id_usuario = ?',
+                                    (id, id_usuario)).fetchone()
+        finally:
+            conn.close()
+        if registro is None:
+            return None
+        return f'{id}.{registro[0]}'
+
+    @classmethod
+    def marcador_alteracao_usuario(cls, id_usuario: int) -> str:
+        '''Retorna um texto que muda sempre que alguma planilha do usuário é criada, alterada ou excluída.'''
+        conn = cls._obter_conexao()
+        try:
+            quantidade, maior_id, soma_versoes = conn.execute(
+                'SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(versao), 0) FROM planilhas WHERE id_usuario = ?',
+                (id_usuario,)).fetchone()
+        finally:
+            conn.close()
+        return f'{quantidade}.{maior_id}.{soma_versoes}'
+
+    @classmethod
+    def painel(cls, id_usuario: int) -> list[dict]:
+        '''Resume todas as planilhas do usuário com uma única consulta (ver SQL_PAINEL).
+
+        Retorna:
+            Uma lista, em ordem de id, de dicionários com `planilha` (sem as relações
+            carregadas), `participantes` (quantidade), `total` depositado, `ultimo_lancamento`
+            (data ou None) e `percentual` do objetivo (None se o objetivo for zero).
+        '''
+        conn = cls._obter_conexao()
+        try:
+            registros = conn.execute(SQL_PAINEL, (id_usuario,)).fetchall()
+        finally:
+            conn.close()
+        resumos = []
+        for registro in registros:
+            p = cls._carregar_registro(registro[:7])
+            participantes, total, ultimo_lancamento = registro[7:]
+            resumos += [{
+                'planilha': p,
+                'participantes': participantes,
+                'total': total,
+                'ultimo_lancamento': ultimo_lancamento,
+                'percentual': 100 * total / p.objetivo if p.objetivo else None,
+            }]
+        return resumos
+
+    def linhas_exportacao(self):
+        '''Gerador com os lançamentos da planilha e o nome dos participantes, para exportação.
+
+        Lê do banco em lotes, então a memória usada não depende da quantidade de lançamentos.
+
+        Retorna:
+            Um gerador de (id, data, participante, descrição, valor), em ordem de data.
+        '''
+        sql = '''SELECT l.id, l.data, p.nome, l.descricao, l.valor
+                 FROM lancamentos l
+                 LEFT JOIN participantes p ON p.id = l.id_participante
+                 WHERE l.id_planilha = ?
+                 ORDER BY l.data, l.id'''
+        for registro in self._iterar_registros(sql, (self.id,)):
+            yield tuple(registro)
+
     def periodo_meses(self) -> int:
         '''Retorna o período da planilha em meses.'''
-        datetime_ini = datetime.strptime(self.data_ini, '%Y-%m-%d')
-        datetime_fim = datetime.strptime(self.data_fim, '%Y-%m-%d')
         # O +1 é pra contar pelo menos 1 mês
-        diferenca = diferenca_meses(datetime_ini, datetime_fim) + 1
+        diferenca = indice_mes(self.data_fim) - indice_mes(self.data_ini) + 1
         return diferenca
 
+    def totais_por_mes(self) -> list[tuple[int, str, float]]:
+        '''Retorna os totais dos lançamentos da planilha por participante e mês.
+
+        Lê a tabela `totais_mensais`, mantida pelos gatilhos de `lancamentos`.
+
+        Retorna:
+            Uma lista de (id do participante, mês 'AAAA-MM', total).
+        '''
+        conn = self._obter_conexao()
+        try:
+            registros = conn.execute(
+                '''SELECT id_participante, mes, total
+                   FROM totais_mensais
+                   WHERE id_planilha = ?''', (self.id,)).fetchall()
+        finally:
+            conn.close()
+        return [tuple(r) for r in registros]
+
+    def totais_participantes(self) -> list[tuple[int, str, float, int]]:
+        '''Retorna o total depositado por cada participante da planilha, inclusive os sem lançamentos.
+
+        Soma os totais mensais (ver `totais_por_mes`), não os lançamentos.
+
+        Retorna:
+            Uma lista de (id do participante, nome, total, quantidade de lançamentos), em ordem de id.
+        '''
+        conn = self._obter_conexao()
+        try:
+            registros = conn.execute(
+                '''SELECT p.id, p.nome, COALESCE(SUM(t.total), 0), COALESCE(SUM(t.quantidade), 0)
+                   FROM participantes p
+                   LEFT JOIN totais_mensais t ON t.id_planilha = p.id_planilha AND t.id_participante = p.id
+                   WHERE p.id_planilha = ?
+                   GROUP BY p.id
+                   ORDER BY p.id''', (self.id,)).fetchall()
+        finally:
+            conn.close()
+        return [tuple(r) for r in registros]
+
+    def saldos_mensais(self) -> list[tuple[int, str, float]]:
+        '''Retorna o saldo acumulado de cada participante ao fim de cada mês com lançamentos.
+
+        O acumulado é calculado pelo banco com uma função de janela sobre os totais mensais.
+
+        Retorna:
+            Uma lista de (id do participante, mês 'AAAA-MM', saldo acumulado até o mês),
+            em ordem de participante e mês.
+        '''
+        conn = self._obter_conexao()
+        try:
+            registros = conn.execute(
+                '''SELECT id_participante, mes,
+                          SUM(total) OVER (PARTITION BY id_participante ORDER BY mes)
+                   FROM totais_mensais
+                   WHERE id_planilha = ?
+                   ORDER BY id_participante, mes''', (self.id,)).fetchall()
+        finally:
+            conn.close()
+        return [tuple(r) for r in registros]
+
+    def progresso(self) -> dict:
+        '''Retorna quanto já foi depositado na planilha e o percentual do objetivo.
+
+        Retorna:
+            Um dicionário com `objetivo`, `total` e `percentual` (None se o objetivo for zero).
+        '''
+        conn = self._obter_conexao()
+        try:
+            total = conn.execute('SELECT COALESCE(SUM(total), 0) FROM totais_mensais WHERE id_planilha = ?',
+                                 (self.id,)).fetchone()[0]
+        finally:
+            conn.close()
+        percentual = 100 * total / self.objetivo if self.objetivo else None
+        return {'objetivo': self.objetivo, 'total': total, 'percentual': percentual}
+
+    def matriz_mensal(self, no_banco: bool = True) -> MatrizMensal:
+        '''Retorna os totais dos lançamentos por participante e mês da planilha.
+
+        Parâmetros:
+            - no_banco: se True, as somas são feitas pelo banco (ver `totais_por_mes`) e
+              `self.lancamentos` não precisa estar carregado. Se False, soma `self.lancamentos`.
+        '''
+        if no_banco:
+            totais = self.totais_por_mes()
+        else:
+            totais = ((l.participante, l.data, l.valor) for l in self.lancamentos)
+        return agregar_por_mes([p.id for p in self.participantes], self.participantes,
+                               self.data_ini, self.periodo_meses(), totais)
+
     def dados_grafico(self) -> list[list]:
-        '''Retorna os dados necessários para desenhar o gráfico da planilha.'''
-        datetime_ini = datetime.strptime(self.data_ini, '%Y-%m-%d')
-        
-        # Associa cada participante a uma linha na matriz
-        id_indice = {}
-        indice = 0
-        for p in self.participantes:
-            id_indice[p.id] = indice
-            indice += 1
-        
-        # Cria colunas zeradas para cada mês e cada participante
-        dados = []
-        for p in self.participantes:
-            colunas = [p]
-            for _ in range(self.periodo_meses()):
-                colunas += [0]
-            dados += [colunas]
-        
-        # Soma os lançamentos ao mês correspondente
-        for l in self.lancamentos:
-            data_lancamento = datetime.strptime(l.data, "%Y-%m-%d")
-            # Esse +1 compensa o participante
-            mes = diferenca_meses(datetime_ini, data_lancamento) + 1
-            linha = id_indice[l.participante]
-            dados[linha][mes] += l.valor
-
-        return dados
+        '''Retorna os dados necessários para desenhar o gráfico da planilha.
+
+        Cada linha começa com o participante, seguido do total de cada mês.
+        Só os participantes precisam estar carregados: as somas vêm do banco.
+        '''
+        def gerar():
+            matriz = self.matriz_mensal()
+            return [[p] + totais for p, totais in zip(matriz.linhas, matriz.valores)]
+
+        if getattr(self, 'id', None) is None:
+            return gerar()
+        # Os participantes fazem parte da chave: o resultado depende de quais foram carregados.
+        chave = ('dados_grafico', self.id, self.versao, tuple(p.id for p in self.participantes))
+        return cache_planilhas.obter_ou_gerar(chave, gerar)
+
+    def conciliacao(self, taxa_juros: float = 0.0) -> Conciliacao:
+        '''Compara o que cada participante depositou, acumulado mês a mês, com o que deveria.
+
+        O esperado é a mensalidade por participante que SimulacaoJurosCompostos calcula para
+        atingir o objetivo no período da planilha. Parte dos totais de `dados_grafico`, então
+        só os participantes precisam estar carregados. O resultado fica em cache até a
+        planilha mudar.
+
+        Parâmetros:
+            - taxa_juros: Taxa mensal de juros usada na simulação. Com 0, o esperado é o
+              objetivo dividido igualmente pelos meses e participantes.
+
+        Retorna:
+            Uma util.agregacao.Conciliacao, com uma linha por participante.
+        '''
+        def gerar():
+            periodo = self.periodo_meses()
+            if periodo < 1:
+                # data_fim antes do mês de data_ini: não há meses a comparar.
+                return conciliar(MatrizMensal([[] for _ in self.participantes], self.participantes, []), 0.0)
+            modelo = SimulacaoJurosCompostos(self.objetivo, taxa_juros, periodo,
+                                              max(len(self.participantes), 1), atingir_objetivo=True)
+            mensalidade_por_participante, _, _ = simular_em_cache(modelo)
+            linhas = self.dados_grafico()
+            matriz = MatrizMensal([linha[1:] for linha in linhas], [linha[0] for linha in linhas],
+                                  rotulos_meses(self.data_ini, periodo))
+            return conciliar(matriz, mensalidade_por_participante)
+
+        if getattr(self, 'id', None) is None:
+            return gerar()
+        chave = ('conciliacao', self.id, self.versao, tuple(p.id for p in self.participantes), round(taxa_juros, 12))
+        return cache_planilhas.obter_ou_gerar(chave, gerar)
@@ -1,6 +1,10 @@
 from models.base import Base
 from flask_login import UserMixin   
-import sqlite3
+from util.cache import CacheLRU
+
+# Usuários carregados recentemente. Evita uma consulta ao banco em toda requisição autenticada.
+# Cada acerto é uma consulta a menos: ver cache_usuarios.estatisticas()['acertos'].
+cache_usuarios = CacheLRU(max_itens=1024, ttl=300)
 
 
 class User(UserMixin, Base):
@@ -15,15 +19,12 @@ class User(UserMixin, Base):
         - senha: senha.
     '''
 
-    @staticmethod
-    def _obter_conexao():
-        '''Obtém uma conexão com o banco de dados.'''
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+    # UserMixin não declara __slots__, então User ainda tem __dict__.
+    __slots__ = ('nome', 'email', 'senha')
+
+    _tabela = 'usuarios'
 
     def __init__(self, id: int, nome: str, email: str, senha:str):
-        super().__init__(tabela='usuarios')
         self.id = id
         self.nome = nome
         self.email = email
@@ -90,3 +91,28 @@ class User(UserMixin, Base):
             return usuarios[0]
         if len(usuarios) == 0:
             return None
+
+    @classmethod
+    def get_em_cache(cls, id: int) -> 'User | None':
+        '''Como `get`, mas consulta o banco só se o usuário não estiver em cache.
+
+        Os usuários ficam em cache por até 5 minutos, ou até serem alterados,
+        excluídos ou saírem do sistema (ver `invalidar_cache`).
+        '''
+        return cache_usuarios.obter_ou_gerar(str(id), lambda: cls.get(id))
+
+    @staticmethod
+    def invalidar_cache(id: int):
+        '''Remove o usuário do cache, para que a próxima leitura venha do banco.'''
+        cache_usuarios.remover(str(id))
+
+    def salvar(self) -> int:
+        '''Salva no banco e remove o usuário do cache.'''
+        id = super().salvar()
+        self.invalidar_cache(id)
+        return id
+
+    def excluir(self):
+        '''Exclui o registro do banco e remove o usuário do cache.'''
+        super().excluir()
+        self.invalidar_cache(self.id)
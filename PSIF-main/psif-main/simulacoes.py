@@ -1,11 +1,161 @@
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from util.cache import CacheLRU
+
+# Casas decimais usadas para normalizar as entradas nas chaves do cache de simulações.
+# Entradas que só diferem depois disso (ex.: ruído de ponto flutuante ao converter a taxa
+# anual em mensal) compartilham o resultado.
+CASAS_OBJETIVO = 2
+CASAS_TAXA = 12
+
+# Resultados de `simular`, compartilhados entre as rotas. Cada item é uma tupla pequena.
+cache_simulacoes = CacheLRU(max_itens=4096)
+
+
+def _fator_direto(taxa: float, periodo: int) -> float:
+    '''Fator de acumulação pela fórmula direta ((1 + taxa)^periodo - 1) / taxa.
+
+    Usado quando expm1/log1p não dão um número finito: taxas de -100% ou menos, em que
+    log1p não se aplica, ou estouro. Como o período é inteiro, a potência de base
+    negativa é definida. O custo não depende do período.
+    '''
+    base = 1 + taxa
+    periodo = int(periodo)
+    try:
+        potencia = base ** periodo
+    except OverflowError:
+        potencia = math.copysign(math.inf, base) if periodo % 2 else math.inf
+    return (potencia - 1) / taxa
+
+
+def fator_acumulacao(taxa: float, periodo: int) -> float:
+    '''Quanto acumulam aportes de 1 no fim de cada mês: ((1 + taxa)^periodo - 1) / taxa.
+
+    Usa expm1/log1p, que não perdem precisão com taxas muito pequenas, e tende a `periodo`
+    quando a taxa é zero.
+    '''
+    if taxa == 0:
+        return float(periodo)
+    try:
+        fator = math.expm1(periodo * math.log1p(taxa)) / taxa
+    except (ValueError, OverflowError):
+        fator = math.nan
+    if not math.isfinite(fator):
+        fator = _fator_direto(taxa, periodo)
+    return fator
+
+
+def fatores_acumulacao(taxas, periodos):
+    '''Versão vetorizada de `fator_acumulacao`.
+
+    Recebe números ou sequências (com broadcasting, se NumPy estiver disponível) e
+    retorna um array do NumPy ou, sem NumPy, uma lista. Se todos forem números, retorna um número.
+    '''
+    if _escalares(taxas, periodos):
+        return fator_acumulacao(taxas, periodos)
+    if np is None:
+        taxas, periodos = _como_listas(taxas, periodos)
+        return [fator_acumulacao(t, n) for t, n in zip(taxas, periodos)]
+    taxas, periodos = np.broadcast_arrays(np.asarray(taxas, dtype=float), np.asarray(periodos, dtype=float))
+    with np.errstate(all='ignore'):
+        sem_juros = taxas == 0
+        fatores = np.where(sem_juros, periodos,
+                           np.expm1(periodos * np.log1p(taxas)) / np.where(sem_juros, 1.0, taxas))
+    # Casos extremos (ex.: taxa <= -100% ou estouro) caem para a fórmula direta.
+    extremos = ~np.isfinite(fatores)
+    with np.errstate(all='ignore'):
+        fatores[extremos] = ((np.power(1 + taxas[extremos], np.trunc(periodos[extremos])) - 1)
+                             / taxas[extremos])
+    return fatores
+
+
+def mensalidades_necessarias(objetivos, taxas, periodos):
+    '''Mensalidade total necessária para atingir cada objetivo, vetorizada.
+
+    Inverte a fórmula da anuidade: mensalidade = objetivo / fator_acumulacao(taxa, periodo).
+    Aceita números ou sequências; retorna um array do NumPy ou, sem NumPy, uma lista.
+    Se todos forem números, retorna um número.
+    '''
+    fatores = fatores_acumulacao(taxas, periodos)
+    if _escalares(objetivos, taxas, periodos):
+        return objetivos / fatores
+    if np is None:
+        objetivos, fatores = _como_listas(objetivos, fatores)
+        return [o / f for o, f in zip(objetivos, fatores)]
+    return np.asarray(objetivos, dtype=float) / fatores
+
+
+def _escalares(*valores) -> bool:
+    '''Indica se todos os valores são números, e não sequências ou arrays.'''
+    if np is not None:
+        return all(np.ndim(v) == 0 for v in valores)
+    return not any(isinstance(v, (list, tuple)) for v in valores)
+
+
+def _como_listas(*valores) -> list[list]:
+    '''Converte números e sequências em listas do mesmo tamanho (broadcasting simples, sem NumPy).'''
+    tamanho = max((len(v) for v in valores if isinstance(v, (list, tuple))), default=1)
+    listas = []
+    for v in valores:
+        if isinstance(v, (list, tuple)):
+            if len(v) != tamanho:
+                raise ValueError('As sequências precisam ter o mesmo tamanho.')
+            listas += [list(v)]
+        else:
+            listas += [[v] * tamanho]
+    return listas
+
+
+def _cronograma(mensalidade_total: float, taxa: float, meses: int, num_participantes: int):
+    '''Gera as linhas do cronograma mês a mês. Veja `Simulacao.cronograma`.'''
+    saldo = 0.0
+    aporte_por_participante = mensalidade_total / num_participantes
+    for mes in range(1, int(meses) + 1):
+        juros = saldo * taxa
+        saldo += juros + mensalidade_total
+        yield {
+            'mes': mes,
+            'aporte': mensalidade_total,
+            'aporte_por_participante': aporte_por_participante,
+            'juros': juros,
+            'saldo': saldo,
+            'saldo_por_participante': saldo / num_participantes,
+        }
+
+
 class Simulacao:
     '''Um modelo de simulação de rendimento.'''
 
+    # Colunas das linhas geradas por `cronograma`, na ordem.
+    COLUNAS_CRONOGRAMA = ('mes', 'aporte', 'aporte_por_participante', 'juros', 'saldo', 'saldo_por_participante')
+
     def simular() -> float:
         '''Simula o rendimento baseado em juros compostos.
         '''
         raise Exception('Método abstrato.')
 
+    def chave(self) -> tuple | None:
+        '''Identifica a simulação no cache: a classe e as entradas normalizadas.
+
+        Retorna None se o resultado não puder ser guardado (ex.: simulações aleatórias sem semente).
+        '''
+        raise Exception('Método abstrato.')
+
+    def cronograma(self):
+        '''Gera a evolução do investimento mês a mês, sem montar a lista inteira na memória.
+
+        Cada linha é um dicionário com as COLUNAS_CRONOGRAMA: o mês (começando em 1), o aporte
+        total e por participante, os juros do mês sobre o saldo anterior e o saldo ao fim do mês,
+        total e por participante. O saldo do último mês é o montante acumulado de `simular`.
+        '''
+        raise Exception('Método abstrato.')
+
 
 class SimulacaoSemRendimento(Simulacao):
     '''Modelo de simulação sem rendimento.
@@ -28,6 +178,13 @@ class SimulacaoSemRendimento(Simulacao):
         mensalidade_por_participante = self.objetivo / self.num_parcelas / self.num_participantes
         return mensalidade_por_participante, mensalidade_total, montante_acumulado 
 
+    def chave(self) -> tuple:
+        return (type(self).__name__, round(self.objetivo, CASAS_OBJETIVO), self.num_parcelas, self.num_participantes)
+
+    def cronograma(self):
+        '''Gera a evolução mês a mês. Veja `Simulacao.cronograma`; aqui os juros são sempre zero.'''
+        return _cronograma(self.objetivo / self.num_parcelas, 0.0, self.num_parcelas, self.num_participantes)
+
 
 class SimulacaoJurosCompostos(Simulacao):
     '''Modelo de simulação de rendimento com juros simples.
@@ -37,19 +194,23 @@ class SimulacaoJurosCompostos(Simulacao):
         - `taxa_juros`: Taxa mensal de juros.
         - `periodo_meses`: Período de rendimento em meses.
         - `num_participantes`: Quantidade de participantes do investimento.
+        - `atingir_objetivo`: Se True, calcula a mensalidade que faz o montante acumulado
+          chegar exatamente ao objetivo. Se False, divide o objetivo pelos meses (modo antigo).
     '''
 
-    def __init__(self, objetivo: float, taxa_juros: float, periodo_meses: int, num_participantes: int):
+    def __init__(self, objetivo: float, taxa_juros: float, periodo_meses: int, num_participantes: int,
+                 atingir_objetivo: bool = False):
         self.objetivo = objetivo
         self.taxa_juros = taxa_juros
         self.periodo_meses = periodo_meses
         self.num_participantes = num_participantes
+        self.atingir_objetivo = atingir_objetivo
 
     def simular(self) -> tuple[float, float, float]:
         '''Simula o rendimento baseado em juros compostos.
 
-        TODO: Calcular a mensalidade para atingir o montante acumulado mais próximo possível do objetivo.
-        Atualmente, estamos calculando o montante acumulado baseado na divisão simples do objetivo por participantes e meses.
+        Com `atingir_objetivo`, a mensalidade é a que faz o montante acumulado chegar ao objetivo.
+        Sem, a mensalidade é a divisão simples do objetivo pelos meses e o montante é o que resultar.
 
         Parâmetros:
             - `objetivo`: O valor que se quer atingir ao final do investimento.
@@ -62,16 +223,242 @@ class SimulacaoJurosCompostos(Simulacao):
             - `mensalidade_total`: a mensalidade paga por todos os participantes somadas em um mês apenas.
             - `montante_acumulado`: montante acumulado das mensalidades + rendimento. 
         '''
-        # Cálculo da mensalidade total
-        mensalidade_total = self.objetivo / self.periodo_meses
-        
+        if self.atingir_objetivo:
+            # Inverso da fórmula da anuidade: M = mensalidade x fator  =>  mensalidade = M / fator
+            fator = fator_acumulacao(self.taxa_juros, self.periodo_meses)
+            mensalidade_total = self.objetivo / fator
+            montante_acumulado = mensalidade_total * fator
+        else:
+            # Cálculo da mensalidade total
+            mensalidade_total = self.objetivo / self.periodo_meses
+
+            # Cálculo do montante acumulado usando a fórmula M = C x (1 + i)^t
+            if self.taxa_juros > 0:
+                montante_acumulado = mensalidade_total * (((1 + self.taxa_juros) ** self.periodo_meses - 1) / self.taxa_juros)
+            else:
+                montante_acumulado = mensalidade_total * self.periodo_meses  # Sem juros, apenas somando
+
         # Cálculo da mensalidade por participante
         mensalidade_por_participante = mensalidade_total / self.num_participantes
-        
-        # Cálculo do montante acumulado usando a fórmula M = C x (1 + i)^t
-        if self.taxa_juros > 0:
-            montante_acumulado = mensalidade_total * (((1 + self.taxa_juros) ** self.periodo_meses - 1) / self.taxa_juros)
+
+        return mensalidade_por_participante, mensalidade_total, montante_acumulado
+
+    def chave(self) -> tuple:
+        return (type(self).__name__, round(self.objetivo, CASAS_OBJETIVO), round(self.taxa_juros, CASAS_TAXA),
+                self.periodo_meses, self.num_participantes, self.atingir_objetivo)
+
+    def cronograma(self):
+        '''Gera a evolução mês a mês. Veja `Simulacao.cronograma`.'''
+        _, mensalidade_total, _ = self.simular()
+        return _cronograma(mensalidade_total, self.taxa_juros, self.periodo_meses, self.num_participantes)
+
+
+# Padrões da simulação de Monte Carlo.
+NUM_CAMINHOS = 10000
+PERCENTIS = (5, 25, 50, 75, 95)
+# Caminhos gerados por vez: limita a memória a TAMANHO_BLOCO x meses números (~5,5 MB para 30 anos).
+TAMANHO_BLOCO = 2000
+
+
+def _percentil(ordenados: list[float], percentil: float) -> float:
+    '''Percentil com interpolação linear (como o padrão do NumPy) numa lista já ordenada.'''
+    posicao = (len(ordenados) - 1) * percentil / 100
+    abaixo = math.floor(posicao)
+    acima = min(abaixo + 1, len(ordenados) - 1)
+    return ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+
+
+class SimulacaoMonteCarlo(Simulacao):
+    '''Modelo de simulação de juros compostos com taxa variável.
+
+    Em vez de uma taxa fixa, sorteia a taxa de cada mês de uma distribuição normal e simula
+    `num_caminhos` trajetórias, para estimar a faixa de montantes possíveis e a chance de
+    atingir o objetivo com a mensalidade calculada pela taxa média.
+
+    Atributos
+        - `objetivo`: O valor que se quer atingir ao final do investimento.
+        - `taxa_juros`: Taxa mensal média de juros.
+        - `volatilidade`: Desvio padrão da taxa mensal.
+        - `periodo_meses`: Período de rendimento em meses.
+        - `num_participantes`: Quantidade de participantes do investimento.
+        - `atingir_objetivo`: Como em SimulacaoJurosCompostos, considerando a taxa média.
+        - `num_caminhos`: Quantidade de trajetórias simuladas.
+        - `semente`: Semente do gerador aleatório. Com a mesma semente, o resultado se repete.
+    '''
+
+    def __init__(self, objetivo: float, taxa_juros: float, volatilidade: float, periodo_meses: int,
+                 num_participantes: int, atingir_objetivo: bool = False, num_caminhos: int = NUM_CAMINHOS,
+                 semente: int | None = None):
+        self.objetivo = objetivo
+        self.taxa_juros = taxa_juros
+        self.volatilidade = volatilidade
+        self.periodo_meses = periodo_meses
+        self.num_participantes = num_participantes
+        self.atingir_objetivo = atingir_objetivo
+        self.num_caminhos = num_caminhos
+        self.semente = semente
+
+    def mensalidade_total(self) -> float:
+        '''A mensalidade total, calculada como em SimulacaoJurosCompostos com a taxa média.'''
+        if self.atingir_objetivo:
+            return self.objetivo / fator_acumulacao(self.taxa_juros, self.periodo_meses)
+        return self.objetivo / self.periodo_meses
+
+    def montantes(self, tamanho_bloco: int = TAMANHO_BLOCO):
+        '''Simula as trajetórias e retorna o montante final de cada uma.
+
+        Com NumPy, gera os caminhos em blocos de `tamanho_bloco` e retorna um array; o resultado
+        não depende do tamanho do bloco. Sem NumPy, simula mês a mês e retorna uma lista
+        (mais lento, e com outros números para a mesma semente).
+        '''
+        mensalidade = self.mensalidade_total()
+        meses = int(self.periodo_meses)
+        if np is None:
+            gerador = random.Random(self.semente)
+            montantes = []
+            for _ in range(self.num_caminhos):
+                saldo = 0.0
+                for _ in range(meses):
+                    taxa = max(gerador.gauss(self.taxa_juros, self.volatilidade), -1.0)
+                    saldo = saldo * (1 + taxa) + mensalidade
+                montantes += [saldo]
+            return montantes
+
+        gerador = np.random.default_rng(self.semente)
+        montantes = np.empty(self.num_caminhos)
+        for inicio in range(0, self.num_caminhos, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, self.num_caminhos)
+            # Fator de cada mês; uma taxa abaixo de -100% perderia mais do que o saldo.
+            fatores = 1 + np.maximum(gerador.normal(self.taxa_juros, self.volatilidade, (fim - inicio, meses)), -1.0)
+            # O aporte do mês k rende nos meses k+1..n: soma dos produtos acumulados de trás para frente.
+            crescimento = np.cumprod(fatores[:, :0:-1], axis=1)
+            montantes[inicio:fim] = mensalidade * (1 + crescimento.sum(axis=1))
+        return montantes
+
+    def chave(self) -> tuple | None:
+        if self.semente is None:
+            return None
+        return (type(self).__name__, round(self.objetivo, CASAS_OBJETIVO), round(self.taxa_juros, CASAS_TAXA),
+                round(self.volatilidade, CASAS_TAXA), self.periodo_meses, self.num_participantes,
+                self.atingir_objetivo, self.num_caminhos, self.semente)
+
+    def distribuicao(self, percentis=PERCENTIS) -> dict:
+        '''Resume a distribuição dos montantes finais.
+
+        Parâmetros:
+            - `percentis`: Os percentis a calcular, de 0 a 100.
+
+        Retorna:
+            Um dicionário com `mensalidade_por_participante`, `mensalidade_total`, `media`,
+            `percentis` (percentil -> montante) e `probabilidade_objetivo`, a fração dos
+            caminhos que chegou ao objetivo.
+        '''
+        mensalidade_total = self.mensalidade_total()
+        montantes = self.montantes()
+        if np is not None:
+            valores = np.percentile(montantes, percentis).tolist()
+            media = float(montantes.mean())
+            probabilidade = float(np.count_nonzero(montantes >= self.objetivo)) / len(montantes)
+        else:
+            ordenados = sorted(montantes)
+            valores = [_percentil(ordenados, p) for p in percentis]
+            media = sum(montantes) / len(montantes)
+            probabilidade = sum(1 for m in montantes if m >= self.objetivo) / len(montantes)
+        return {
+            'mensalidade_por_participante': mensalidade_total / self.num_participantes,
+            'mensalidade_total': mensalidade_total,
+            'media': media,
+            'percentis': dict(zip(percentis, valores)),
+            'probabilidade_objetivo': probabilidade,
+        }
+
+    def simular(self) -> tuple[float, float, float]:
+        '''Simula as trajetórias e retorna os mesmos valores de SimulacaoJurosCompostos.
+
+        Retorna:
+            - `mensalidade_por_participante`: a mensalidade paga por cada participante.
+            - `mensalidade_total`: a mensalidade paga por todos os participantes somadas em um mês apenas.
+            - `montante_acumulado`: a mediana dos montantes simulados.
+
+        Para as faixas de percentis e a chance de atingir o objetivo, use `distribuicao`.
+        '''
+        resultado = self.distribuicao(percentis=(50,))
+        return (resultado['mensalidade_por_participante'], resultado['mensalidade_total'],
+                resultado['percentis'][50])
+
+
+def simular_em_cache(modelo: Simulacao) -> tuple[float, float, float]:
+    '''Retorna `modelo.simular()`, reaproveitando o resultado de uma simulação igual já feita.
+
+    As simulações são identificadas por `modelo.chave()`. O acompanhamento de acertos fica em
+    `cache_simulacoes.estatisticas()`.
+    '''
+    chave = modelo.chave()
+    if chave is None:
+        return modelo.simular()
+    return cache_simulacoes.obter_ou_gerar(chave, modelo.simular)
+
+
+# Quantidade máxima de combinações numa grade de cenários.
+MAX_CENARIOS = 10000
+
+
+def simular_grade(objetivo: float, taxas, periodos, participantes, atingir_objetivo: bool = True) -> list[dict]:
+    '''Simula juros compostos para todas as combinações de taxa, período e participantes de uma vez.
+
+    Equivale a rodar SimulacaoJurosCompostos para cada combinação, mas calcula a grade
+    inteira numa única passada vetorizada (com NumPy, se disponível).
+
+    Parâmetros:
+        - `objetivo`: O valor que se quer atingir ao final do investimento.
+        - `taxas`: Taxas mensais de juros.
+        - `periodos`: Períodos em meses.
+        - `participantes`: Quantidades de participantes.
+        - `atingir_objetivo`: Como em SimulacaoJurosCompostos.
+
+    Retorna:
+        Uma linha por combinação (taxa, período, participantes, nessa ordem de variação), com
+        `taxa_juros`, `periodo_meses`, `num_participantes`, `mensalidade_por_participante`,
+        `mensalidade_total` e `montante_acumulado`.
+
+    Lança ValueError se a grade passar de MAX_CENARIOS combinações.
+    '''
+    taxas, periodos, participantes = list(taxas), list(periodos), list(participantes)
+    if len(taxas) * len(periodos) * len(participantes) > MAX_CENARIOS:
+        raise ValueError(f'A grade passa de {MAX_CENARIOS} cenários.')
+
+    if np is not None:
+        t, n, p = (a.ravel() for a in np.meshgrid(np.asarray(taxas, dtype=float),
+                                                   np.asarray(periodos, dtype=float),
+                                                   np.asarray(participantes, dtype=float),
+                                                   indexing='ij'))
+    else:
+        t = [x for x in taxas for _ in periodos for _ in participantes]
+        n = [x for _ in taxas for x in periodos for _ in participantes]
+        p = [x for _ in taxas for _ in periodos for x in participantes]
+
+    fatores = fatores_acumulacao(t, n)
+    if np is not None:
+        mensalidades = objetivo / fatores if atingir_objetivo else objetivo / n
+        montantes = mensalidades * fatores
+        por_participante = mensalidades / p
+        colunas = (t.tolist(), n.tolist(), p.tolist(), por_participante.tolist(),
+                   mensalidades.tolist(), montantes.tolist())
+    else:
+        if atingir_objetivo:
+            mensalidades = [objetivo / f for f in fatores]
         else:
-            montante_acumulado = mensalidade_total * self.periodo_meses  # Sem juros, apenas somando
+            mensalidades = [objetivo / x for x in n]
+        montantes = [m * f for m, f in zip(mensalidades, fatores)]
+        por_participante = [m / x for m, x in zip(mensalidades, p)]
+        colunas = (t, n, p, por_participante, mensalidades, montantes)
 
-        return mensalidade_por_participante, mensalidade_total, montante_acumulado
\ No newline at end of file
+    nomes = ('taxa_juros', 'periodo_meses', 'num_participantes', 'mensalidade_por_participante',
+             'mensalidade_total', 'montante_acumulado')
+    linhas = []
+    for valores in zip(*colunas):
+        linha = dict(zip(nomes, valores))
+        linha['periodo_meses'] = int(linha['periodo_meses'])
+        linha['num_participantes'] = int(linha['num_participantes'])
+        linhas += [linha]
+    return linhas
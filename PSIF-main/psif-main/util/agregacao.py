@@ -0,0 +1,127 @@
+'''Agregação de lançamentos por linha (ex.: participante) e mês.
+
+Usa NumPy quando disponível e cai para Python puro caso contrário.
+'''
+from itertools import accumulate
+
+from util.datas import indice_mes, mes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class MatrizMensal:
+    '''Totais agregados por linha e mês.
+
+    Atributos:
+        - valores: lista de linhas; cada linha tem um total por mês.
+        - linhas: o rótulo de cada linha (ex.: o objeto Participante).
+        - colunas: o rótulo de cada mês, como 'jan/2024'.
+    '''
+
+    def __init__(self, valores: list[list[float]], linhas: list, colunas: list[str]):
+        self.valores = valores
+        self.linhas = linhas
+        self.colunas = colunas
+
+
+def rotulos_meses(data_ini: str, num_meses: int) -> list[str]:
+    '''Retorna os rótulos 'mes/ano' dos `num_meses` meses a partir de `data_ini`.'''
+    inicio = indice_mes(data_ini)
+    rotulos = []
+    for i in range(num_meses):
+        ano, m = divmod(inicio + i, 12)
+        rotulos += [f'{mes(m + 1)}/{ano}']
+    return rotulos
+
+
+def agregar_por_mes(chaves: list, rotulos_linhas: list, data_ini: str, num_meses: int,
+                    lancamentos) -> MatrizMensal:
+    '''Soma os valores dos lançamentos em cada (linha, mês).
+
+    Parâmetros:
+        - chaves: a chave de cada linha, na ordem das linhas (ex.: ids dos participantes).
+        - rotulos_linhas: o rótulo de cada linha, na mesma ordem.
+        - data_ini: a data 'AAAA-MM-DD' do primeiro mês.
+        - num_meses: quantidade de meses (colunas).
+        - lancamentos: iterável de (chave, data 'AAAA-MM-DD', valor).
+
+    Lançamentos com chave desconhecida ou fora do período são ignorados.
+
+    Retorna:
+        Uma MatrizMensal.
+    '''
+    # data_fim antes de data_ini resulta num período negativo: trata como nenhum mês.
+    num_meses = max(num_meses, 0)
+    linha_da_chave = {chave: i for i, chave in enumerate(chaves)}
+    num_linhas = len(chaves)
+    inicio = indice_mes(data_ini)
+
+    # Converte cada lançamento em uma posição (linha, mês) uma única vez.
+    posicoes = []
+    valores = []
+    for chave, data, valor in lancamentos:
+        linha = linha_da_chave.get(chave)
+        coluna = indice_mes(data) - inicio
+        if linha is None or not 0 <= coluna < num_meses:
+            continue
+        posicoes += [linha * num_meses + coluna]
+        valores += [valor]
+
+    if np is not None:
+        totais = np.bincount(np.asarray(posicoes, dtype=np.intp),
+                             weights=np.asarray(valores, dtype=float),
+                             minlength=num_linhas * num_meses)
+        matriz = totais.reshape(num_linhas, num_meses).tolist()
+    else:
+        totais = [0] * (num_linhas * num_meses)
+        for posicao, valor in zip(posicoes, valores):
+            totais[posicao] += valor
+        matriz = [totais[i * num_meses:(i + 1) * num_meses] for i in range(num_linhas)]
+
+    return MatrizMensal(matriz, list(rotulos_linhas), rotulos_meses(data_ini, num_meses))
+
+
+class Conciliacao:
+    '''Comparação, mês a mês, entre o que cada linha deveria ter acumulado e o que acumulou.
+
+    Atributos:
+        - linhas: o rótulo de cada linha (ex.: o objeto Participante).
+        - colunas: o rótulo de cada mês, como 'jan/2024'.
+        - esperado: o total acumulado esperado até cada mês (igual para todas as linhas).
+        - realizado: lista de linhas; cada linha tem o total acumulado até cada mês.
+        - diferenca: realizado - esperado, por linha e mês. Negativo quando a linha está atrasada.
+    '''
+
+    def __init__(self, linhas: list, colunas: list[str], esperado: list[float],
+                 realizado: list[list[float]], diferenca: list[list[float]]):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.esperado = esperado
+        self.realizado = realizado
+        self.diferenca = diferenca
+
+
+def conciliar(matriz: MatrizMensal, aporte_mensal: float) -> Conciliacao:
+    '''Compara os totais mensais de `matriz` com um aporte fixo por mês, em valores acumulados.
+
+    Parâmetros:
+        - matriz: os totais de cada linha por mês (ver `agregar_por_mes`).
+        - aporte_mensal: quanto cada linha deveria contribuir por mês.
+
+    Retorna:
+        Uma Conciliacao.
+    '''
+    num_meses = len(matriz.colunas)
+    if np is not None:
+        esperado = aporte_mensal * np.arange(1, num_meses + 1)
+        realizado = np.cumsum(np.asarray(matriz.valores, dtype=float).reshape(len(matriz.linhas), num_meses), axis=1)
+        diferenca = realizado - esperado
+        esperado, realizado, diferenca = esperado.tolist(), realizado.tolist(), diferenca.tolist()
+    else:
+        esperado = [aporte_mensal * (i + 1) for i in range(num_meses)]
+        realizado = [list(accumulate(valores)) for valores in matriz.valores]
+        diferenca = [[r - e for r, e in zip(linha, esperado)] for linha in realizado]
+    return Conciliacao(list(matriz.linhas), list(matriz.colunas), esperado, realizado, diferenca)
@@ -0,0 +1,113 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Limites padrão do cache de planilhas.
+MAX_ITENS = 1024
+MAX_BYTES = 32 * 1024 * 1024
+
+
+def estimar_tamanho(valor) -> int:
+    '''Estimativa do tamanho em bytes de `valor`, somando o conteúdo de listas, tuplas e dicionários.'''
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, (list, tuple)):
+        tamanho += sum(estimar_tamanho(v) for v in valor)
+    elif isinstance(valor, dict):
+        tamanho += sum(estimar_tamanho(k) + estimar_tamanho(v) for k, v in valor.items())
+    return tamanho
+
+
+class CacheLRU:
+    '''Cache LRU limitado pela quantidade de itens e pelo tamanho estimado em memória.
+
+    Quando um dos limites é ultrapassado, os itens usados há mais tempo são descartados.
+
+    Parâmetros:
+        - max_itens: quantidade máxima de itens.
+        - max_bytes: soma máxima dos tamanhos estimados dos itens.
+        - ttl: tempo de vida dos itens em segundos. None para não expirar.
+    '''
+
+    def __init__(self, max_itens: int = MAX_ITENS, max_bytes: int = MAX_BYTES, ttl: float | None = None):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (valor, tamanho, expira_em)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._contadores = {'acertos': 0, 'falhas': 0, 'descartes': 0, 'expirados': 0}
+
+    def obter(self, chave, padrao=None):
+        '''Retorna o valor guardado em `chave` ou `padrao`, caso não exista.'''
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[2] is not None and item[2] <= time.monotonic():
+                del self._itens[chave]
+                self._bytes -= item[1]
+                self._contadores['expirados'] += 1
+                item = None
+            if item is None:
+                self._contadores['falhas'] += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self._contadores['acertos'] += 1
+            return item[0]
+
+    def guardar(self, chave, valor):
+        '''Guarda `valor` em `chave`. Valores maiores que `max_bytes` não são guardados.'''
+        tamanho = estimar_tamanho(valor)
+        if tamanho > self.max_bytes:
+            return
+        expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._trava:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._itens[chave] = (valor, tamanho, expira_em)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, tamanho_descartado, _) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_descartado
+                self._contadores['descartes'] += 1
+
+    def obter_ou_gerar(self, chave, gerar):
+        '''Retorna o valor guardado em `chave`. Se não existir, chama `gerar()` e guarda o resultado.
+
+        Resultados None não são guardados.
+        '''
+        valor = self.obter(chave)
+        if valor is None:
+            valor = gerar()
+            if valor is not None:
+                self.guardar(chave, valor)
+        return valor
+
+    def remover(self, chave):
+        '''Descarta o item guardado em `chave`, se existir.'''
+        with self._trava:
+            item = self._itens.pop(chave, None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def limpar(self):
+        '''Descarta todos os itens. Os contadores são mantidos.'''
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        '''Retorna acertos, falhas, taxa de acertos (de 0 a 1), descartes, expirados, quantidade de
+        itens e bytes ocupados.'''
+        with self._trava:
+            estatisticas = dict(self._contadores)
+            estatisticas['itens'] = len(self._itens)
+            estatisticas['bytes'] = self._bytes
+        consultas = estatisticas['acertos'] + estatisticas['falhas']
+        estatisticas['taxa_acertos'] = estatisticas['acertos'] / consultas if consultas else 0.0
+        return estatisticas
+
+
+# Cache compartilhado das páginas e dados das planilhas.
+# As chaves incluem o id e a versão da planilha, então alterações nunca leem dados antigos.
+cache_planilhas = CacheLRU()
@@ -31,4 +31,12 @@ def mes(indice: int) -> str:
     elif indice == 11:
         return 'nov'
     elif indice == 12:
-        return 'dez'
\ No newline at end of file
+        return 'dez'
+
+def indice_mes(data: str) -> int:
+    '''Converte uma data 'AAAA-MM-DD' num número de mês absoluto (ano*12 + mês - 1).
+
+    Lê só o ano e o mês direto do texto, sem `strptime`. A diferença entre os índices
+    de duas datas é igual a `diferenca_meses` entre elas.
+    '''
+    return int(data[:4]) * 12 + int(data[5:7]) - 1